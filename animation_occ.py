@@ -1,22 +1,47 @@
 from animations_occ import GCodeVisualizer
+from function_occ import GCodeParser, ModalState, ARC_TOLERANCE
+from stock_occ import DEFAULT_ENGINE
+from simulation_occ import simulate
+import threading
+import numpy as np
 
-def start_animation(commands, width, length, height):
-    vis = GCodeVisualizer(length, height, width)
-    for cmd in commands:
-        parsed = vis.parser.parse(
-            cmd, 
+def start_animation(commands, width, length, height, arc_tolerance=ARC_TOLERANCE, engine=DEFAULT_ENGINE,
+                    headless=False, time_warp=1.0, on_ready=None, resume=None, profile=False, visualizer=None,
+                    progress=None, keep_open=True):
+    if headless:
+        return simulate(commands, width, length, height, engine, arc_tolerance)
+    if visualizer is None:
+        vis = GCodeVisualizer(length, height, width, arc_tolerance, engine, time_warp, profile=profile)
+    else:
+        vis = visualizer
+        if not vis.on_gui_thread():
+            raise RuntimeError("Przeglądarka może być używana tylko w wątku, w którym utworzono okno")
+        vis.reset(length, height, width, arc_tolerance, engine, time_warp, profile=profile)
+    vis.running = True
+    if on_ready is not None:
+        on_ready(vis)
+    if resume is not None:
+        vis.resume(resume)
+        commands = commands[resume.index:]
+    if isinstance(commands, np.ndarray):
+        moves = GCodeParser.moves_as_dicts(commands, vis.last_position.Z())
+    else:
+        state = ModalState(
             [vis.last_position.X(), vis.last_position.Y(), vis.last_position.Z()],
             3000
         )
-        print(f"Executing: {parsed}")
-        
-        if parsed['type'] == 'G00':
-            vis.g00(parsed['x'], parsed['y'], parsed['z'])
-        elif parsed['type'] == 'G01':
-            vis.g01(parsed['x'], parsed['y'], parsed['z'])
-        elif parsed['type'] == 'ARC':
-            vis.g02_g03(parsed)
-        elif parsed['type'] == 'TOOL_CHANGE':
-            vis.change_tool(parsed['radius'])
+        moves = GCodeParser.iter_moves(commands, state)
 
-    vis.start_display()
+    # Symulacja liczy w osobnym wątku, a ten wątek tylko rysuje ze stałą liczbą klatek.
+    threading.Thread(target=vis.run, args=(moves, progress), daemon=True).start()
+    try:
+        vis.render_loop()
+        vis.write_profile()
+    finally:
+        vis.running = False
+
+    # Okno już działa, gdy animacja korzysta z wcześniej utworzonej przeglądarki, a przy
+    # keep_open=False pętlę zdarzeń okna prowadzi wywołujący (vis.wait_for).
+    if visualizer is None and keep_open:
+        vis.start_display()
+        vis.closed = True
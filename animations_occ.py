@@ -11,23 +11,53 @@ from OCC.Core.Quantity import (
 )
 from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeBox, BRepPrimAPI_MakeCylinder
 from OCC.Core.TopLoc import TopLoc_Location
+from OCC.Core.TopExp import TopExp_Explorer
+from OCC.Core.TopAbs import TopAbs_FACE
 from OCC.Display.SimpleGui import init_display
-from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Cut
-from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_Transform
-from function_occ import GCodeParser
+from function_occ import GCodeParser, ARC_TOLERANCE, RAPID_FEEDRATE
+from stock_occ import make_stock, linear_steps, DEFAULT_ENGINE
+from trail_occ import TrailBuffer
+from profiler_occ import Profiler, PROFILE_TRACE
+from worker_occ import SimulationCancelled
+import queue
+import threading
 import time
-import math
 from OCC.Core.GeomAbs import GeomAbs_Shape
 import numpy as np
 
+FRAME_RATE = 30
+FRAME_QUEUE_SIZE = 4
+
+
+def _qt_application():
+    try:
+        from OCC.Display.backend import get_qt_modules
+        return get_qt_modules()[2].QApplication.instance()
+    except Exception:
+        return None
+
+
 class GCodeVisualizer:
-    def __init__(self, height, length, width):
+    def __init__(self, height, length, width, arc_tolerance=ARC_TOLERANCE, engine=DEFAULT_ENGINE,
+                 time_warp=1.0, frame_rate=FRAME_RATE, trail_tolerance=None, profile=False):
         self.display, self.start_display, self.add_menu, self.close = init_display()
+        # Okno OCC należy do wątku, który je utworzył; inne wątki przekazują mu wywołania przez kolejkę.
+        self.owner = threading.get_ident()
+        self.calls = queue.Queue()
+        self.application = _qt_application()
         self.parser = GCodeParser()
+        self.arc_tolerance = arc_tolerance
+        self.engine = engine
+        self.time_warp = time_warp
+        self.frame_rate = frame_rate
+        self.frames = queue.Queue(FRAME_QUEUE_SIZE)
+        self.pending_frame = None
+        self.machine_time = 0.0
+        self.clock_start = None
         
         self.workpiece = None
         self.tool = None
-        self.trail_points = []
+        self.trail = TrailBuffer(tolerance=trail_tolerance)
         self.trail_shape = None
         self.feedrate = 1000
         self.last_position = gp_Pnt(0, 0, 5)
@@ -37,10 +67,91 @@ class GCodeVisualizer:
         self.workpiece_ais = None        
         self.workpiece_color = None 
         self.workpiece_transparency = None
+        self.workpiece_dirty = False
+        self.workpiece_refreshed = 0.0
+        self.running = False
+        self.closed = False
         
         self._init_workpiece(height, width, length)
         self._init_tool(2.0, 10)
         self._init_view()
+        self._init_profiler(profile)
+
+    def reset(self, height, length, width, arc_tolerance=ARC_TOLERANCE, engine=DEFAULT_ENGINE,
+              time_warp=1.0, profile=False):
+        # Okno i prezentacja przedmiotu zostają, czyszczone są tylko stan symulacji, ślad i narzędzie.
+        self.arc_tolerance = arc_tolerance
+        self.engine = engine
+        self.time_warp = time_warp
+        self.frames = queue.Queue(FRAME_QUEUE_SIZE)
+        self.pending_frame = None
+        self.machine_time = 0.0
+        self.clock_start = None
+        self.feedrate = 1000
+        self.last_position = gp_Pnt(0, 0, 5)
+
+        for segment in self.trail_segments + [self.trail_shape, self.tool]:
+            if segment is not None:
+                self.display.Context.Remove(segment, False)
+        self.trail_segments = []
+        self.trail_shape = None
+        self.trail.clear()
+
+        self._init_workpiece(height, width, length)
+        self._init_tool(2.0, 10)
+        self.workpiece_dirty = False
+        self._init_profiler(profile)
+        self.display.View.FitAll()
+
+    def _init_profiler(self, profile):
+        self.profiler = None
+        if profile:
+            self.profiler = Profiler()
+            self._instrument()
+
+    def _instrument(self):
+        profiler = self.profiler
+        profiler.instrument(self, 'execute', phase='move', line_of=lambda parsed: parsed.get('line'))
+        for name in ('cut', 'cut_line', 'cut_arc', 'flush'):
+            profiler.instrument(self.stock, name, phase='cut')
+        if hasattr(self.stock, 'cut_shapes'):
+            profiler.instrument(
+                self.stock, 'cut_shapes', phase='boolean',
+                after=lambda: profiler.count('booleans', profiler.totals['boolean'][0])
+            )
+        profiler.instrument(
+            self, '_tessellate', phase='tessellation',
+            after=lambda: profiler.count('faces', self._count_faces())
+        )
+        profiler.instrument(
+            self, '_update_trail', phase='trail',
+            after=lambda: profiler.count('ais_objects', self._count_ais())
+        )
+        profiler.instrument(self, '_update_tool_position', phase='tool')
+        profiler.instrument(self, '_redraw', phase='redraw')
+        profiler.instrument(
+            self, '_sleep', phase='sleep',
+            after=lambda: profiler.count('sleep', profiler.totals['sleep'][1])
+        )
+
+    def _count_faces(self):
+        faces = 0
+        explorer = TopExp_Explorer(self.current_workpiece_shape, TopAbs_FACE)
+        while explorer.More():
+            faces += 1
+            explorer.Next()
+        return faces
+
+    def _count_ais(self):
+        return 2 + len(self.trail_segments) + (self.trail_shape is not None)
+
+    def write_profile(self, path=PROFILE_TRACE):
+        if self.profiler is None:
+            return
+        self.profiler.restore()
+        self.profiler.write_chrome_trace(path)
+        print(self.profiler.report())
+        print(f"Ślad profilowania zapisano w {path}")
 
     def _init_view(self):
         self.display.View.SetBgGradientColors(
@@ -60,23 +171,30 @@ class GCodeVisualizer:
         translation.SetTranslation(gp_Vec(0, 0, -height))
         box = box.Moved(TopLoc_Location(translation))
         
-        self.workpiece = self.display.DisplayShape(
-            box,
-            color=Quantity_Color(Quantity_NOC_GRAY75),
-            transparency=0.6
-        )[0]
-        
+        self.stock = make_stock(self.engine, length, width, height, self.arc_tolerance)
         self.workpiece_shape = box
         self.current_workpiece_shape = box
         self.workpiece_color = Quantity_Color(Quantity_NOC_GRAY75)
         self.workpiece_transparency = 0.6
-        self.workpiece_ais = self.display.DisplayShape(
-            box, 
-            color=self.workpiece_color,
-            transparency=self.workpiece_transparency
-        )[0]
+        if self.workpiece_ais is None:
+            self.workpiece_ais = self.display.DisplayShape(
+                box, 
+                color=self.workpiece_color,
+                transparency=self.workpiece_transparency
+            )[0]
+        else:
+            self.workpiece_ais.SetShape(box)
+            self.display.Context.Redisplay(self.workpiece_ais, False)
+        self.workpiece = self.workpiece_ais
 
     def _init_tool(self, radius, length):
+        self._show_tool(radius, length)
+        
+        self.tool_radius = radius
+        self.tool_length = length
+        self.tool_shape = BRepPrimAPI_MakeCylinder(radius, length).Shape()
+
+    def _show_tool(self, radius, length):
         cylinder = BRepPrimAPI_MakeCylinder(radius, length).Shape()
         self.tool = self.display.DisplayShape(
             cylinder, 
@@ -85,10 +203,6 @@ class GCodeVisualizer:
         )[0]
         
         self._update_tool_position(self.last_position)
-        
-        self.tool_radius = radius
-        self.tool_length = length
-        self.tool_shape = BRepPrimAPI_MakeCylinder(radius, length).Shape()
 
     def _update_tool_position(self, new_pos):
         trsf = gp_Trsf()
@@ -96,125 +210,323 @@ class GCodeVisualizer:
         location = TopLoc_Location(trsf)
         self.display.Context.SetLocation(self.tool, location)
 
-    def _update_trail(self, new_pos):
-        from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakeEdge
-        
-        if len(self.trail_points) >= 1:
-            last_pnt = self.trail_points[-1]
-            
-            if (last_pnt.Distance(new_pos) > 1e-6):
-                edge_builder = BRepBuilderAPI_MakeEdge(last_pnt, new_pos)
-                if edge_builder.IsDone():
-                    edge = edge_builder.Edge()
-                    segment = self.display.DisplayShape(
-                        edge, 
-                        color=Quantity_Color(Quantity_NOC_YELLOW),
-                        update=False
-                    )[0]
-                    self.trail_segments.append(segment)
-                else:
-                    print(f"Ostrzeżenie: Nie udało się utworzyć śladu między {last_pnt} a {new_pos}")
-        
-        self.trail_points.append(new_pos)
+    def _polyline(self, points):
+        from OCC.Core.BRepBuilderAPI import BRepBuilderAPI_MakePolygon
 
-    def change_tool(self, new_radius):
+        polygon = BRepBuilderAPI_MakePolygon()
+        for x, y, z in points:
+            polygon.Add(gp_Pnt(x, y, z))
+        if not polygon.IsDone():
+            return None
+        return polygon.Wire()
+
+    def _show_polyline(self, ais, polyline):
+        if ais is None:
+            return self.display.DisplayShape(
+                polyline,
+                color=Quantity_Color(Quantity_NOC_YELLOW),
+                update=False
+            )[0]
+        ais.SetShape(polyline)
+        self.display.Context.Redisplay(ais, False)
+        return ais
+
+    def _update_trail(self, points):
+        # Zamknięte fragmenty zostają jako stałe polilinie, przebudowywany jest tylko ostatni.
+        for chunk in self.trail.extend(points):
+            polyline = self._polyline(chunk)
+            if polyline is None:
+                print(f"Ostrzeżenie: Nie udało się utworzyć śladu od {tuple(chunk[0])} do {tuple(chunk[-1])}")
+                continue
+            self.trail_segments.append(self._show_polyline(self.trail_shape, polyline))
+            self.trail_shape = None
+
+        polyline = self._polyline(self.trail.open_chunk())
+        if polyline is not None:
+            self.trail_shape = self._show_polyline(self.trail_shape, polyline)
+
+    def _remove_material(self, start, end):
+        return self.stock.cut(
+            (start.X(), start.Y(), start.Z()), (end.X(), end.Y(), end.Z()),
+            self.tool_radius, self.tool_length
+        )
+
+    def _refresh_workpiece(self, force=False):
+        now = time.perf_counter()
+        if not self.workpiece_dirty or (not force and now < self.workpiece_refreshed):
+            return
+
+        # Jedna prezentacja przedmiotu: podmieniany jest tylko kształt, a ponowna tesselacja
+        # odbywa się najwyżej raz na klatkę (dłużej, jeśli sama tesselacja trwa dłużej).
+        self._tessellate()
+        self.workpiece_dirty = False
+        elapsed = time.perf_counter() - now
+        self.workpiece_refreshed = time.perf_counter() + max(1.0 / self.frame_rate, elapsed)
+
+    def _tessellate(self):
+        self.current_workpiece_shape = self.stock.shape()
+        self.workpiece_ais.SetShape(self.current_workpiece_shape)
+        self.display.Context.Redisplay(self.workpiece_ais, False)
+
+    def _redraw(self):
+        self.display.View.Redraw()
+
+    def _sleep(self, seconds):
+        time.sleep(seconds)
+
+    def on_gui_thread(self):
+        return threading.get_ident() == self.owner
+
+    def process_events(self):
+        while True:
+            try:
+                function, args = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            function(*args)
+        if self.application is not None:
+            self.application.processEvents()
+
+    def window_open(self):
+        if self.application is None:
+            return not self.closed
+        return any(widget.isVisible() for widget in self.application.topLevelWidgets())
+
+    def wait_for(self, jobs, interval=None):
+        # Między animacjami wątek okna obsługuje zdarzenia Qt i czeka na kolejne zlecenie.
+        if self.application is None:
+            self.start_display()
+            self.closed = True
+            return None
+        interval = interval or 1.0 / self.frame_rate
+        while True:
+            self.process_events()
+            if not self.window_open():
+                self.closed = True
+                return None
+            try:
+                return jobs.get(timeout=interval)
+            except queue.Empty:
+                pass
+
+    def show_stock(self, stock, position=None):
+        # Przeglądarka pokazuje kopię stanu, żeby nie współdzielić półfabrykatu z osią czasu.
+        self.show_snapshot(stock.snapshot(), position)
+
+    def show_snapshot(self, data, position=None):
+        if not self.on_gui_thread():
+            self.calls.put((self.show_snapshot, (data, position)))
+            return
+        if self.running:
+            # W trakcie animacji półfabrykat należy do wątku symulacji.
+            return
+        self.stock.restore(data)
+        self.workpiece_dirty = True
+        self._refresh_workpiece(force=True)
+        if position is not None:
+            self.last_position = gp_Pnt(*position)
+            self._update_tool_position(self.last_position)
+        self._redraw()
+
+    def resume(self, keyframe):
+        self.stock.restore(keyframe.load())
+        self.tool_radius = keyframe.tool_radius
+        self.last_position = gp_Pnt(*keyframe.position)
         if self.tool is not None:
             self.display.Context.Remove(self.tool, True)
+        self._show_tool(self.tool_radius, self.tool_length)
+        self.workpiece_dirty = True
+        self._refresh_workpiece(force=True)
+
+    def _advance(self, seconds):
+        self.machine_time += seconds
+        if self.time_warp is None:
+            return
+        delay = self.clock_start + self.machine_time / self.time_warp - time.perf_counter()
+        if delay > 0:
+            self._sleep(delay)
+
+    def _emit(self, position, stock_changed=False, tool_radius=None, done=False):
+        frame = self.pending_frame or {'position': None, 'trail': [], 'stock': False, 'tool_radius': None, 'done': False}
+        frame['position'] = position
+        frame['trail'].append((position.X(), position.Y(), position.Z()))
+        frame['stock'] |= stock_changed
+        frame['done'] = done
+        if tool_radius is not None:
+            frame['tool_radius'] = tool_radius
+
+        # Gdy renderowanie nie nadąża, klatki pośrednie są scalane zamiast blokować symulację.
+        if done:
+            self.frames.put(frame)
+            self.pending_frame = None
+            return
+        try:
+            self.frames.put_nowait(frame)
+            self.pending_frame = None
+        except queue.Full:
+            self.pending_frame = frame
+
+    def run(self, moves, progress=None):
+        self.clock_start = time.perf_counter()
+        status = ('finished',)
+        try:
+            for index, parsed in enumerate(moves):
+                if progress is not None:
+                    # Czas wstrzymania nie jest liczony do tempa symulacji.
+                    self.clock_start += progress.update(index, parsed.get('line'))
+                self.execute(parsed)
+        except SimulationCancelled:
+            status = ('cancelled',)
+        except Exception as e:
+            status = ('error', str(e))
+            raise
+        finally:
+            self.finish()
+            if progress is not None:
+                progress.finish(status)
+
+    def execute(self, parsed):
+        if parsed['type'] == 'G00':
+            self.g00(parsed['x'], parsed['y'], parsed['z'], parsed['f'])
+        elif parsed['type'] == 'G01':
+            self.g01(parsed['x'], parsed['y'], parsed['z'], parsed['f'])
+        elif parsed['type'] == 'ARC':
+            self.g02_g03(parsed)
+        elif parsed['type'] == 'TOOL_CHANGE':
+            self.change_tool(parsed['radius'])
+
+    def finish(self):
+        self._emit(self.last_position, self.stock.flush(), done=True)
+        if hasattr(self.stock, 'report'):
+            report = self.stock.report()
+            print(
+                f"Cięcia wsadowe (partia {report['batch_size'] or 'operacja'}): {report['batches']} partii, "
+                f"{report['tools']} narzędzi, {report['throughput']:.1f} narzędzi/s, "
+                f"średnie opóźnienie {report['mean_latency']:.3f} s"
+            )
+
+    def _collect_frames(self, timeout):
+        try:
+            frame = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        while not frame['done']:
+            try:
+                newer = self.frames.get_nowait()
+            except queue.Empty:
+                break
+            newer['trail'] = frame['trail'] + newer['trail']
+            newer['stock'] |= frame['stock']
+            if newer['tool_radius'] is None:
+                newer['tool_radius'] = frame['tool_radius']
+            frame = newer
+        return frame
+
+    def _render(self, frame):
+        if frame['tool_radius'] is not None:
+            if self.tool is not None:
+                self.display.Context.Remove(self.tool, True)
+            self._show_tool(frame['tool_radius'], self.tool_length)
+        self._update_trail(frame['trail'])
+        self._update_tool_position(frame['position'])
+        self.workpiece_dirty |= frame['stock']
+        self._refresh_workpiece(force=frame['done'])
+        if frame['done']:
+            self.display.View.FitAll()
+        self._redraw()
+
+    def render_loop(self):
+        interval = 1.0 / self.frame_rate
+        while True:
+            frame_start = time.perf_counter()
+            self.process_events()
+            frame = self._collect_frames(interval)
+            if frame is not None:
+                self._render(frame)
+                if frame['done']:
+                    return
+            delay = frame_start + interval - time.perf_counter()
+            if delay > 0:
+                self._sleep(delay)
+
+    def change_tool(self, new_radius):
+        changed = self.stock.flush()
+        self.tool_radius = new_radius
+        self._emit(self.last_position, changed, tool_radius=new_radius)
         
-        current_length = self.tool_length
-        
-        self._init_tool(new_radius, current_length)
-        
-        self._update_tool_position(self.last_position)
-        
-    def g00(self, x, y, z):
+    def g00(self, x, y, z, f=RAPID_FEEDRATE):
         target = gp_Pnt(x, y, z)
         vec = gp_Vec(self.last_position, target)
         distance = vec.Magnitude()
+        time_total = (distance / f) * 60
         
         steps = max(5, int(distance * 0.5))
         
         for i in range(steps):
             t = i / steps
             current = self.last_position.Translated(vec * t)
-            self._update_tool_position(current)
-            self._update_trail(current)
-            time.sleep(0.01)
-            self.display.View.Redraw()
+            self._advance(time_total / steps)
+            self._emit(current)
         
         self.last_position = target
 
-    def g01(self, x, y, z):
+    def g01(self, x, y, z, f=None):
+        if f:
+            self.feedrate = f
         target = gp_Pnt(x, y, z)
         vec = gp_Vec(self.last_position, target)
         distance = vec.Magnitude()
         time_total = (distance / self.feedrate) * 60
-        steps = max(10, int(distance * 2))
+        steps = linear_steps(distance)
+        previous = self.last_position
 
         for i in range(steps):
             t = i / steps
             current = self.last_position.Translated(vec * t)
-            self._update_tool_position(current)
-            self._update_trail(current)
-
-            if current.Z() <= 0:
-                trsf = gp_Trsf()
-                trsf.SetTranslation(gp_Vec(current.X(), current.Y(), current.Z()))
-                moved_tool = BRepBuilderAPI_Transform(self.tool_shape, trsf).Shape()
-                cut = BRepAlgoAPI_Cut(self.current_workpiece_shape, moved_tool)
-
-                if cut.IsDone():
-                    self.current_workpiece_shape = cut.Shape()
-                    self.display.Context.Remove(self.workpiece_ais, False)
-                    self.workpiece_ais = self.display.DisplayShape(
-                        self.current_workpiece_shape,
-                        color=self.workpiece_color,
-                        transparency=self.workpiece_transparency
-                    )[0]
-
-            time.sleep(time_total / steps)
-            self.display.View.Redraw()
+            changed = False
+            if self.stock.stepwise:
+                changed = self._remove_material(previous, current)
+                previous = current
 
+            self._advance(time_total / steps)
+            self._emit(current, changed)
+
+        self._emit(target, self._remove_material(previous, target))
         self.last_position = target
     
     def g02_g03(self, params):
+        if params['f']:
+            self.feedrate = params['f']
         center = gp_Pnt(params['center'][0], params['center'][1], params['center'][2])
         radius = params['radius']
         start_angle = params['start_angle']
         end_angle = params['end_angle']
-        steps = params['steps']
-        is_cw = params['is_cw']
 
         angular_dist = end_angle - start_angle
-        angles = np.linspace(start_angle, start_angle + angular_dist, steps)
+        time_total = (abs(angular_dist) * radius / self.feedrate) * 60
+        start_z = self.last_position.Z()
+        end_z = params['z']
+        # Te same punkty łuku (z interpolacją Z) co w symulacji bez okna i w Stock.cut_arc.
+        points = GCodeParser.arc_points(
+            (center.X(), center.Y()), radius, start_angle, end_angle, start_z, end_z,
+            self.tool_radius, self.arc_tolerance
+        )[1:]
+        steps = len(points)
+        previous = self.last_position
 
-        for angle in angles:
-            x = center.X() + radius * math.cos(angle)
-            y = center.Y() + radius * math.sin(angle)
-            z = self.last_position.Z()
-            
+        for x, y, z in points.tolist():
             current_pos = gp_Pnt(x, y, z)
-            self._update_tool_position(current_pos)
-            self._update_trail(current_pos)
-
-            if current_pos.Z() <= 0:
-                trsf = gp_Trsf()
-                trsf.SetTranslation(gp_Vec(current_pos.X(), current_pos.Y(), current_pos.Z()))
-                moved_tool = BRepBuilderAPI_Transform(self.tool_shape, trsf).Shape()
-                
-                cut = BRepAlgoAPI_Cut(self.current_workpiece_shape, moved_tool)
-                
-                if cut.IsDone():
-                    self.current_workpiece_shape = cut.Shape()
-                    self.display.Context.Remove(self.workpiece_ais, False)
-                    self.workpiece_ais = self.display.DisplayShape(
-                        self.current_workpiece_shape,
-                        color=self.workpiece_color,
-                        transparency=self.workpiece_transparency
-                    )[0]
-
-            self.display.View.Redraw()
-            time.sleep(0.01)
-        
+            changed = False
+            if self.stock.stepwise:
+                changed = self._remove_material(previous, current_pos)
+                previous = current_pos
+
+            self._advance(time_total / steps)
+            self._emit(current_pos, changed)
+
+        if not self.stock.stepwise:
+            self._emit(current_pos, self.stock.cut_arc(
+                (center.X(), center.Y()), radius, start_angle, end_angle,
+                start_z, end_z, self.tool_radius, self.tool_length
+            ))
         self.last_position = current_pos
-        self.display.View.FitAll()
\ No newline at end of file
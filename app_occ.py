@@ -1,9 +1,37 @@
 import tkinter as tk
 from tkinter import simpledialog, messagebox, filedialog
-from animation_occ import start_animation
-from function_occ import GCodeParser
+from function_occ import GCodeParser, ARC_TOLERANCE
+from io_occ import ProgramFile, write_program, program_filetypes, throughput_text
+from cache_occ import ProgramCache
+from program_occ import ProgramModel
+from parallel_occ import ParallelParser
+from estimator_occ import TimeEstimator, MOVE_NAMES
+from collision_occ import find_collisions
+from worker_occ import SimulationProcess, PROGRESS_POLL_MS
+from toolpath_occ import rectangular_pocket, circular_pocket, drill, bore, gcode_lines
 import threading
-import math
+import time
+import numpy as np
+
+MAX_LISTED_OPERATIONS = 10
+ANALYSIS_POLL_MS = 100
+SIMULATION_ENGINES = (
+    ("Z-map (szybki)", 'zmap'),
+    ("B-rep, objętość omiatana (dokładny)", 'swept'),
+    ("B-rep, wsadowo", 'batch'),
+    ("B-rep, krokowo", 'brep')
+)
+COLLISION_NAMES = {
+    'rapid': "ruch szybki przez materiał",
+    'plunge': "wejście w materiał z posuwem szybkim",
+    'shank': "kolizja chwytu narzędzia"
+}
+TIME_WARPS = {
+    "1x": 1.0,
+    "10x": 10.0,
+    "max": None
+}
+
 
 class App:
     def __init__(self, root):
@@ -19,7 +47,37 @@ class App:
         self.pre_height = 0
         self.workpiece_params = {}
         self.max_tool_radius = 20
+        self.arc_tolerance = ARC_TOLERANCE
+        self.program_cache = ProgramCache()
+        self.program_parser = ParallelParser()
+        self.program_model = ProgramModel(parser=self.program_parser)
+        self.analysis_lock = threading.Lock()
+        self.simulation_engine = SIMULATION_ENGINES[0][1]
+        self.time_warp = "1x"
+        self.profile_animation = False
+        self.resume_after_edit = False
+        self.animation_starting = False
+        self.simulation = None
+        self.progress_text = tk.StringVar(root, value="")
+        self.timeline = None
+        self.timeline_key = None
+        self.timeline_lock = threading.Lock()
         self.main_menu()
+        # Proces symulacji (razem z pythonOCC) uruchamia się w tle dopiero po pokazaniu okna.
+        self.root.after_idle(self._simulation_process)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def close(self):
+        # Procesy parsera i symulacji są zamykane razem z oknem, żeby nie zostały w tle.
+        self.program_parser.shutdown()
+        if self.simulation is not None:
+            self.simulation.close()
+        self.root.destroy()
+
+    def _simulation_process(self):
+        if self.simulation is None or not self.simulation.alive():
+            self.simulation = SimulationProcess()
+        return self.simulation
 
     def main_menu(self):
         self.clear_window()
@@ -39,18 +97,16 @@ class App:
         self.root.after(50, self._update_window_min_size)
 
     def load_existing_program(self):
-        path = filedialog.askopenfilename(
-            filetypes=[("G-code files", "*.gcode"), ("Text files", "*.txt"), ("All files", "*.*")]
-        )
+        path = filedialog.askopenfilename(filetypes=program_filetypes())
         if not path:
             return
 
         try:
-            with open(path, 'r') as f:
-                self.program_data = [line.strip() for line in f.readlines()]
+            self.program_data = ProgramFile(path)
         except Exception as e:
             messagebox.showerror("Błąd", f"Błąd wczytywania pliku: {str(e)}")
             return
+        self.program_model = ProgramModel(parser=self.program_parser)
 
         self.request_program_name(is_new_program=False)
         
@@ -106,18 +162,23 @@ class App:
         except Exception as e:
             print(f"Błąd: {e}")
 
-    def input_pre(self):
+    def input_pre(self, on_saved=None):
         def on_save():
             try:
-                self.pre_width = float(width_entry.get())
-                self.pre_length = float(length_entry.get())
-                self.pre_height = float(height_entry.get())
-                if self.pre_width <= 0 or self.pre_length <= 0 or self.pre_height <= 0:
+                width = float(width_entry.get())
+                length = float(length_entry.get())
+                height = float(height_entry.get())
+                tolerance = float(tolerance_entry.get())
+                if width <= 0 or length <= 0 or height <= 0 or tolerance <= 0:
                     raise ValueError
-                root.destroy()
-                self.animation_menu()
             except:
                 messagebox.showerror("Błąd", "Wprowadź poprawne wartości dodatnie")
+                return
+            self.pre_width, self.pre_length, self.pre_height = width, length, height
+            # Tolerancja cięciwy łuków wchodzi do kluczy pamięci podręcznej i osi czasu.
+            self.arc_tolerance = tolerance
+            root.destroy()
+            (on_saved or self.animation_menu)()
 
         root = tk.Toplevel(self.root)
         root.title("Wymiary półfabrykatu")
@@ -134,8 +195,13 @@ class App:
         height_entry = tk.Entry(root)
         height_entry.grid(row=2, column=1, padx=5, pady=5)
         
-        tk.Button(root, text="Zapisz", command=on_save).grid(row=3, column=0, padx=5, pady=10)
-        tk.Button(root, text="Anuluj", command=root.destroy).grid(row=3, column=1, padx=5, pady=10)
+        tk.Label(root, text="Tolerancja łuku (mm):").grid(row=3, column=0, padx=5, pady=5)
+        tolerance_entry = tk.Entry(root)
+        tolerance_entry.insert(0, str(self.arc_tolerance))
+        tolerance_entry.grid(row=3, column=1, padx=5, pady=5)
+        
+        tk.Button(root, text="Zapisz", command=on_save).grid(row=4, column=0, padx=5, pady=10)
+        tk.Button(root, text="Anuluj", command=root.destroy).grid(row=4, column=1, padx=5, pady=10)
 
 
     def animation_menu(self):
@@ -144,16 +210,49 @@ class App:
         main_frame.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
 
         tk.Button(main_frame, text="Zmień wymiary półfabrykatu", command=self.input_pre).pack(pady=5, fill=tk.X, expand=True)
+
+        tk.Label(main_frame, text="Silnik usuwania materiału:").pack(pady=(5, 0))
+        engine_var = tk.StringVar(main_frame, value=self.simulation_engine)
+        for text, engine in SIMULATION_ENGINES:
+            tk.Radiobutton(
+                main_frame, text=text, value=engine, variable=engine_var,
+                command=lambda: setattr(self, 'simulation_engine', engine_var.get())
+            ).pack(anchor=tk.W)
+
+        tk.Label(main_frame, text="Tempo symulacji:").pack(pady=(5, 0))
+        warp_var = tk.StringVar(main_frame, value=self.time_warp)
+        warp_frame = tk.Frame(main_frame)
+        warp_frame.pack()
+        for text in TIME_WARPS:
+            tk.Radiobutton(
+                warp_frame, text=text, value=text, variable=warp_var,
+                command=lambda: setattr(self, 'time_warp', warp_var.get())
+            ).pack(side=tk.LEFT)
+
+        profile_var = tk.BooleanVar(main_frame, value=self.profile_animation)
+        tk.Checkbutton(
+            main_frame, text="Profilowanie animacji", variable=profile_var,
+            command=lambda: setattr(self, 'profile_animation', profile_var.get())
+        ).pack(anchor=tk.W)
+        resume_var = tk.BooleanVar(main_frame, value=self.resume_after_edit)
+        tk.Checkbutton(
+            main_frame, text="Wznów od miejsca zmiany w programie", variable=resume_var,
+            command=lambda: setattr(self, 'resume_after_edit', resume_var.get())
+        ).pack(anchor=tk.W)
         
         tk.Button(
             main_frame,
             text="Rozpocznij animację",
-            command=lambda: threading.Thread(
-                target=start_animation,
-                args=(self.program_data, self.pre_width, self.pre_length, self.pre_height),
-                daemon=True
-            ).start()
+            command=self.run_animation
         ).pack(pady=5, fill=tk.X, expand=True)
+
+        control_frame = tk.Frame(main_frame)
+        control_frame.pack(fill=tk.X)
+        tk.Button(control_frame, text="Wstrzymaj/Wznów", command=self.toggle_pause).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(control_frame, text="Przerwij", command=self.cancel_animation).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Label(main_frame, textvariable=self.progress_text).pack(pady=(5, 0))
+
+        tk.Button(main_frame, text="Oś czasu", command=self.timeline_window).pack(pady=5, fill=tk.X, expand=True)
         
         tk.Button(main_frame, text="Powrót", command=self.make_operation).pack(pady=5, fill=tk.X, expand=True)
 
@@ -196,6 +295,7 @@ class App:
             ("Zapisz program", self.save_file),
             ("Edytuj recznie", self.edit_by_hand),
             ("Pokaż czas obróbki", self.show_machining_time),
+            ("Sprawdź kolizje", self.show_collisions),
             ("Powrót", self.make_operation)
         ]
 
@@ -225,16 +325,12 @@ class App:
         tk.Button(button_frame, text="Anuluj", command=editor.destroy).pack(side=tk.RIGHT)
 
     def save_file(self):
-        path = filedialog.asksaveasfilename(
-            defaultextension=".gcode",
-            filetypes=[("G-code files", "*.gcode"), ("Text files", "*.txt"), ("All files", "*.*")]
-        )
+        path = filedialog.asksaveasfilename(defaultextension=".gcode", filetypes=program_filetypes())
         if path:
             try:
-                with open(path, "w") as f:
-                    f.write("\n".join(self.program_data))
+                stats = self.save_to_file(self.program_data, path)
                 self.is_program_saved = True
-                messagebox.showinfo("Sukces", "Plik zapisano pomyślnie")
+                messagebox.showinfo("Sukces", f"Plik zapisano pomyślnie\n{throughput_text(stats)}")
             except Exception as e:
                 messagebox.showerror("Błąd", f"Nie można zapisać pliku: {str(e)}")
                 
@@ -395,60 +491,7 @@ class App:
         back_btn.pack(pady=5)
 
     def circular_pocket_mill(self, x, y, diameter, depth, stepdown, feedrate, tool_radius):
-        commands = []
-        initial_x = x
-        commands.append(f"G0 X{round(x, 3)} Y{round(y, 3)} Z5")
-        if feedrate != '' or feedrate != 0:
-            commands.append(f"F{round(feedrate, 3)}")
-        commands.append("M3")
-        steps_number = depth / stepdown
-        steps_down = []
-        if steps_number % 1 != 0:
-            step_down = 0
-            last_step = depth - int(steps_number) * stepdown
-            for i in range(int(steps_number)):
-                step_down -= stepdown
-                steps_down.append(step_down)
-            steps_down.append(round(step_down - last_step, 3))
-        else:
-            step_down = 0
-            for i in range(int(steps_number)):
-                step_down -= stepdown
-                steps_down.append(step_down)
-        rotations_number = diameter / (tool_radius * 2)
-        rotations_x = []
-        if rotations_number % 1 != 0:
-            rotations_number = int(rotations_number)
-            last_rotation = x - diameter / 2 + tool_radius
-            for i in range(rotations_number):
-                rotations_x.append(x)
-                x -= tool_radius
-            if last_rotation != 0 and initial_x != 0:
-                rotations_x.append(last_rotation)
-                del rotations_x[0]
-        else:
-            for i in range(int(rotations_number)):
-                x -= tool_radius
-                rotations_x.append(x)
-        current_radius = tool_radius
-        for step_down in steps_down:
-            current_radius = tool_radius
-            commands.append(f"G01 X{initial_x} Y{y}")
-            commands.append(f"G01 Z{step_down}")
-            if initial_x != 24:
-                for rotation in rotations_x:
-                    if rotation == initial_x:
-                        continue
-                    commands.append(f"G01 X{rotation}")
-                    if rotation != rotations_x[-1]:
-                        commands.append(f"G02 X{rotation} Y{y} I{current_radius} J0 F{feedrate}")
-                        current_radius += tool_radius
-                    else:
-                        current_radius = initial_x - rotations_x[-1]
-                        commands.append(f"G02 X{rotation} Y{y} I{current_radius} J0 F{feedrate}")
-        commands.append("G0 Z5")
-        commands.append("M5")
-        return commands
+        return gcode_lines(circular_pocket(x, y, diameter, depth, stepdown, feedrate, tool_radius))
 
     def circular_pocket_submenu(self):
         self.clear_window()
@@ -501,45 +544,7 @@ class App:
         back_btn.pack(pady=5)
 
     def rectangular_pocket_mill(self, x, y, width, height, depth, stepdown, feedrate, tool_radius):
-        commands = []
-        num_passes = int(depth / stepdown) + 1
-        commands.append(f"G0 X{round(x + tool_radius, 3)} Y{round(y + tool_radius, 3)} Z5")
-        if feedrate > 0:
-            commands.append(f"F{round(feedrate, 3)}")
-        commands.append("M3")
-        for pass_num in range(num_passes):
-            z_depth = round(pass_num * stepdown, 3)
-            if z_depth == 0.0:
-                continue
-            commands.append(f"G1 Z{-z_depth}")
-            current_x = round(x + tool_radius, 3)
-            current_y = round(y + tool_radius, 3)
-            current_width = round(width - 2 * tool_radius, 3)
-            current_height = round(height - 2 * tool_radius, 3)
-            while current_width > 0 and current_height > 0:
-                commands.append(f"G1 X{round(current_x, 3)} Y{round(current_y, 3)}")
-                commands.append(f"G1 X{round(current_x + current_width, 3)} Y{round(current_y, 3)}")
-                commands.append(f"G1 X{round(current_x + current_width, 3)} Y{round(current_y + current_height, 3)}")
-                commands.append(f"G1 X{round(current_x, 3)} Y{round(current_y + current_height, 3)}")
-                commands.append(f"G1 X{round(current_x, 3)} Y{round(current_y, 3)}")
-                current_x = round(current_x + tool_radius, 3)
-                current_y = round(current_y + tool_radius, 3)
-                current_width = round(current_width - 2 * tool_radius, 3)
-                current_height = round(current_height - 2 * tool_radius, 3)
-        if width > height:
-            fake_square_side = height / 2
-            commands.append(f"G01 X{x + fake_square_side} Y{y + height - fake_square_side}")
-        else:
-            fake_square_side = width / 2
-            commands.append(f"G01 X{x + fake_square_side} Y{y + fake_square_side}")
-            commands.append(f"G01 X{x + width - tool_radius} Y{y + tool_radius}")
-            commands.append(f"G01 X{x + fake_square_side} Y{y + fake_square_side}")
-            commands.append(f"G01 X{x + fake_square_side} Y{y + height - fake_square_side}")
-            commands.append(f"G01 X{x + tool_radius} Y{y + height - tool_radius}")
-            commands.append(f"G01 X{x + fake_square_side} Y{y + height - fake_square_side}")
-            commands.append(f"G01 X{x + width - tool_radius} Y{y + height - tool_radius}")
-        commands.append("M5")
-        return commands
+        return gcode_lines(rectangular_pocket(x, y, width, height, depth, stepdown, feedrate, tool_radius))
 
     def face_mill_submenu(self):
         self.clear_window()
@@ -597,28 +602,7 @@ class App:
         back_btn.pack(pady=5)
 
     def bore_material(self, x=None, y=None, z=None, feedrate=None):
-        if z is None:
-            raise ValueError("Z (głębokość) jest wymagana.")
-        commands = []
-        if x is not None:
-            x = round(x, 3)
-        if y is not None:
-            y = round(y, 3)
-        z = round(z, 3)
-        if feedrate is not None:
-            feedrate = round(feedrate, 3)
-        position_command = "G00"
-        if x is not None:
-            position_command += f" X{x}"
-        if y is not None:
-            position_command += f" Y{y}"
-        position_command += " Z5"
-        commands.append(position_command)
-        if feedrate is not None:
-            commands.append(f"F{feedrate}")
-        commands.append(f"G01 Z{-z}")
-        commands.append("G00 Z5")
-        return commands
+        return gcode_lines(bore(x, y, z, feedrate))
 
     def bore_material_submenu(self):
         self.clear_window()
@@ -667,31 +651,7 @@ class App:
         back_btn.pack(pady=5)
 
     def drill_material(self, x=None, y=None, z=None, feedrate=None):
-        if z is None:
-            raise ValueError("Z (depth) is required.")
-        commands = []
-        if x is not None:
-            x = round(x, 3)
-        if y is not None:
-            y = round(y, 3)
-        z = round(z, 3)
-        if feedrate is not None:
-            feedrate = round(feedrate, 3)
-        position_command = "G00"
-        if x is not None:
-            position_command += f" X{x}"
-        if y is not None:
-            position_command += f" Y{y}"
-        position_command += " Z5"
-        commands.append(position_command)
-        if feedrate is not None:
-            commands.append(f"F{feedrate}")
-        commands.append("M03")
-        commands.append("M08")
-        commands.append(f"G01 Z{-z}")
-        commands.append("G00 Z5")
-        commands.append("M09")
-        return commands
+        return gcode_lines(drill(x, y, z, feedrate))
 
     def drill_material_submenu(self):
         self.clear_window()
@@ -914,19 +874,19 @@ class App:
             return
         filename = f"{self.nazwa_programu}.gcode"
         try:
-            self.save_to_file(self.program_data, filename)
+            stats = self.save_to_file(self.program_data, filename)
             self.is_program_saved = True
-            messagebox.showinfo("Zapisano", f"Program '{self.nazwa_programu}' został zapisany w pliku '{filename}'.")
+            messagebox.showinfo(
+                "Zapisano",
+                f"Program '{self.nazwa_programu}' został zapisany w pliku '{filename}'.\n{throughput_text(stats)}"
+            )
         except Exception as e:
             messagebox.showerror("Błąd zapisu", f"Nie udało się zapisać programu: {e}")
 
     def save_to_file(self, array, filename):
-        with open(filename, 'w') as file:
-            if isinstance(array, list):
-                for item in array:
-                    file.write(f"{item}\n")
-            else:
-                file.write(array)
+        stats = write_program(filename, array)
+        print(f"Zapisano {filename}: {throughput_text(stats)}")
+        return stats
 
     def clear_window(self):
         for widget in self.root.winfo_children():
@@ -960,61 +920,217 @@ class App:
         else:
             self.root.minsize(self.default_width, 0)
 
-    def calculate_machining_time(self):
-        total_time_seconds = 0.0
-        current_position = [0.0, 0.0, 5.0]
-        current_feedrate = 1000
-
-        for cmd in self.program_data:
-            parsed = GCodeParser.parse(
-                cmd, 
-                current_position,
-                current_feedrate
-            )
-            
-            if parsed.get('type') == 'UPDATE_FEED':
-                current_feedrate = parsed['f']
-                continue
-            elif 'f' in parsed:
-                current_feedrate = parsed['f']
-            
-            if parsed['type'] in ['G01', 'ARC']:
-                distance = self._calculate_move_distance(parsed, current_position)
-                if current_feedrate > 0:
-                    total_time_seconds += (distance / current_feedrate) * 60
-            
-            self._update_position(current_position, parsed)
+    def analyze_program(self):
+        with self.analysis_lock:
+            return self._analyze_program()
+
+    def _analyze_program(self):
+        key = self.program_cache.key(self.program_data, self.arc_tolerance)
+        cached = self.program_cache.load(key)
+        if cached is not None:
+            return cached
+
+        self.program_model.update(self.program_data)
+        moves = self.program_model.moves()
+        estimate = TimeEstimator.estimate(moves, tolerance=self.arc_tolerance)
+        analysis = {
+            'moves': moves,
+            'bbox': GCodeParser.bounding_box(moves),
+            'time': estimate['total'],
+            'type_times': np.array([estimate['by_type'][name] for name in MOVE_NAMES]),
+            'operation_times': np.array(
+                [[operation['line'], operation['time']] for operation in estimate['operations']],
+                dtype=np.float64
+            ).reshape(-1, 2)
+        }
+        self.program_cache.store(key, **analysis)
+        return analysis
+
+    def analyze_in_background(self, on_done):
+        self.run_in_background(self.analyze_program, on_done)
+
+    def run_in_background(self, task, on_done, on_error=None):
+        result = {}
 
-        return self._format_time(total_time_seconds)
+        def work():
+            try:
+                result['value'] = task()
+            except Exception as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                self.root.after(ANALYSIS_POLL_MS, poll)
+            elif 'error' in result:
+                if on_error is not None:
+                    on_error()
+                messagebox.showerror("Błąd", f"Błąd obliczeń: {str(result['error'])}")
+            else:
+                on_done(result['value'])
+
+        poll()
+
+    def prepare_timeline(self, moves, build=True):
+        from timeline_occ import build_timeline
+
+        key = (self.simulation_engine, self.pre_width, self.pre_length, self.pre_height, self.arc_tolerance)
+        with self.timeline_lock:
+            # Po edycji programu oś czasu jest odtwarzana od ostatniej klatki kluczowej przed pierwszą
+            # zmianą; dla niezmienionego programu update zwraca None.
+            if self.timeline is not None and self.timeline_key == key:
+                resume = self.timeline.update(moves)
+                if build:
+                    self.timeline.finish()
+                return resume
+            if not build:
+                return None
+            if self.timeline is not None:
+                self.timeline.close()
+            self.timeline = build_timeline(
+                moves, self.pre_width, self.pre_length, self.pre_height, self.simulation_engine, self.arc_tolerance
+            )
+            self.timeline_key = key
+            return None
 
-    def _calculate_move_distance(self, parsed, current_pos):
-        if parsed['type'] == 'ARC':
-            radius = parsed['radius']
-            angle = abs(parsed['end_angle'] - parsed['start_angle'])
-            arc_length_xy = radius * angle
-            dz = parsed['z'] - current_pos[2]
-            return math.sqrt(arc_length_xy**2 + dz**2)
+    def run_animation(self):
+        if self.animation_starting or (self.simulation is not None and self.simulation.busy):
+            messagebox.showinfo("Animacja", "Animacja jest już w toku")
+            return
+        # Flaga jest ustawiana w wątku Tk, zanim przygotowanie programu przejdzie do tła.
+        self.animation_starting = True
+
+        def prepare():
+            moves = self.analyze_program()['moves']
+            # Zwykłe ponowne uruchomienie zawsze pokazuje cały program od początku.
+            if not self.resume_after_edit:
+                return moves, None
+            return moves, self.prepare_timeline(moves, build=False)
+
+        self.progress_text.set("Przygotowanie programu...")
+        self.run_in_background(prepare, self._run_simulation,
+                               on_error=lambda: setattr(self, 'animation_starting', False))
+
+    def _run_simulation(self, prepared):
+        # Oś czasu powstaje dopiero po otwarciu jej okna, żeby proces Tk nie liczył symulacji
+        # równolegle z procesem animacji.
+        moves, resume = prepared
+        if resume is not None and resume.index:
+            print(f"Wznowienie symulacji od linii {resume.line + 2}")
+
+        # Symulacja i okno OCC działają w osobnym procesie, więc nie konkurują z Tk o GIL.
+        try:
+            self._simulation_process().run({
+                'commands': moves,
+                'width': self.pre_width,
+                'length': self.pre_length,
+                'height': self.pre_height,
+                'arc_tolerance': self.arc_tolerance,
+                'engine': self.simulation_engine,
+                'time_warp': TIME_WARPS[self.time_warp],
+                'resume': resume,
+                'profile': self.profile_animation
+            })
+        finally:
+            self.animation_starting = False
+        if resume is not None:
+            # Klatki za miejscem zmiany są liczone w tle dopiero po wysłaniu zlecenia, gdy animacja już trwa.
+            threading.Thread(target=self.prepare_timeline, args=(moves,), daemon=True).start()
+        self._poll_simulation()
+
+    def _poll_simulation(self):
+        simulation = self.simulation
+        state = simulation.poll()
+        if state == 'paused':
+            text = "Animacja wstrzymana"
+        elif simulation.busy and simulation.fraction is None:
+            text = "Uruchamianie animacji..."
+        elif simulation.busy:
+            text = f"Linia {simulation.line + 1}: {simulation.fraction:.0%}"
+            if simulation.eta is not None:
+                text += f", pozostało {self._format_time(simulation.eta)}"
         else:
-            dx = parsed.get('x', current_pos[0]) - current_pos[0]
-            dy = parsed.get('y', current_pos[1]) - current_pos[1]
-            dz = parsed.get('z', current_pos[2]) - current_pos[2]
-            return math.sqrt(dx**2 + dy**2 + dz**2)
-
-    def _update_current_position(self, parsed, current_pos):
-        if parsed['type'] in ['G00', 'G01']:
-            current_pos[0] = parsed.get('x', current_pos[0])
-            current_pos[1] = parsed.get('y', current_pos[1])
-            current_pos[2] = parsed.get('z', current_pos[2])
-        elif parsed['type'] == 'ARC':
-            current_pos[0] = parsed['x']
-            current_pos[1] = parsed['y']
-            current_pos[2] = parsed['z']
-
-    def _update_position(self, current_pos, parsed):
-        if parsed['type'] in ['G00', 'G01', 'ARC']:
-            current_pos[0] = parsed.get('x', current_pos[0])
-            current_pos[1] = parsed.get('y', current_pos[1])
-            current_pos[2] = parsed.get('z', current_pos[2])
+            text = {
+                'finished': "Animacja zakończona",
+                'cancelled': "Animacja przerwana",
+                'error': f"Błąd symulacji: {simulation.error}",
+                'closed': "Okno animacji zamknięte"
+            }.get(state, "")
+        self.progress_text.set(text)
+        if simulation.busy:
+            self.root.after(PROGRESS_POLL_MS, self._poll_simulation)
+
+    def toggle_pause(self):
+        if self.simulation is None or not self.simulation.busy:
+            return
+        if self.simulation.state == 'paused':
+            self.simulation.resume()
+        else:
+            self.simulation.pause()
+
+    def cancel_animation(self):
+        if self.simulation is not None and self.simulation.busy:
+            self.simulation.cancel()
+
+    def timeline_window(self):
+        window = tk.Toplevel(self.root)
+        window.title("Oś czasu")
+        status = tk.Label(window, text="Budowanie osi czasu...")
+        status.pack(padx=10, pady=5)
+        scale = tk.Scale(window, orient=tk.HORIZONTAL, length=400, label="Linia programu", state=tk.DISABLED)
+        scale.pack(padx=10, pady=5, fill=tk.X)
+        seeking = {'busy': False, 'line': None}
+
+        def build():
+            self.prepare_timeline(self.analyze_program()['moves'])
+            return self.timeline
+
+        def on_built(timeline):
+            lines = timeline.moves['line']
+            if len(lines) == 0:
+                status.config(text="Program nie zawiera ruchów")
+                return
+            scale.config(from_=int(lines[0]) + 1, to=int(lines[-1]) + 1, state=tk.NORMAL)
+            scale.set(int(lines[-1]) + 1)
+            report = timeline.report()
+            status.config(
+                text=f"Klatki kluczowe: {report['keyframes']} (na dysku: {report['spilled']})"
+            )
+
+        def seek():
+            line = seeking['line']
+            started = time.perf_counter()
+            with self.timeline_lock:
+                snapshot = self.timeline.seek(line - 1).snapshot()
+                position = self.timeline.simulation.position
+            return line, time.perf_counter() - started, snapshot, position
+
+        def on_seeked(result):
+            line, seconds, snapshot, position = result
+            # Podgląd nie jest wysyłany w trakcie animacji, bo półfabrykat należy wtedy do symulacji.
+            if self.simulation is not None and self.simulation.alive() and not self.simulation.busy:
+                self.simulation.show(self.timeline_key[0], snapshot, position)
+            status.config(text=f"Linia {line}: przewinięto w {seconds:.2f} s")
+            seeking['busy'] = False
+            if seeking['line'] != line:
+                request_seek()
+
+        # Przesuwanie suwaka zapamiętuje tylko ostatnią linię; kolejne przewinięcie rusza po poprzednim.
+        def request_seek(event=None):
+            if self.timeline is None:
+                return
+            seeking['line'] = scale.get()
+            if not seeking['busy']:
+                seeking['busy'] = True
+                self.run_in_background(seek, on_seeked)
+
+        scale.bind("<ButtonRelease-1>", request_seek)
+        self.run_in_background(build, on_built)
+
+    def calculate_machining_time(self):
+        return self._format_time(self.analyze_program()['time'])
 
     def _format_time(self, total_seconds):
         total_seconds = int(round(total_seconds))
@@ -1026,14 +1142,48 @@ class App:
         return f"{hours:02}:{minutes:02}:{seconds:02}"
 
     def show_machining_time(self):
-        try:
-            formatted_time = self.calculate_machining_time()
-            messagebox.showinfo(
-                "Czas obróbki", 
-                f"Szacowany czas: {formatted_time}\n"
-            )
-        except Exception as e:
-            messagebox.showerror("Błąd", f"Błąd obliczeń: {str(e)}")
+        self.analyze_in_background(self._show_analysis)
+
+    def show_collisions(self):
+        # Bez wymiarów półfabrykatu każdy ruch mieściłby się "poza materiałem", więc najpierw trzeba je podać.
+        if self.pre_width <= 0 or self.pre_length <= 0 or self.pre_height <= 0:
+            messagebox.showinfo("Kolizje", "Podaj najpierw wymiary półfabrykatu")
+            self.input_pre(on_saved=self.show_collisions)
+            return
+        self.run_in_background(
+            lambda: find_collisions(
+                self.analyze_program()['moves'], self.pre_length, self.pre_width, self.pre_height,
+                arc_tolerance=self.arc_tolerance
+            ),
+            self._show_collisions
+        )
+
+    def _show_collisions(self, issues):
+        if not issues:
+            messagebox.showinfo("Kolizje", "Nie wykryto kolizji")
+            return
+        details = "".join(
+            f"Linia {issue['line'] + 1}: {COLLISION_NAMES[issue['kind']]} ({issue['depth']:.2f} mm)\n"
+            for issue in issues[:MAX_LISTED_OPERATIONS]
+        )
+        if len(issues) > MAX_LISTED_OPERATIONS:
+            details += f"... i {len(issues) - MAX_LISTED_OPERATIONS} kolejnych\n"
+        messagebox.showwarning("Kolizje", f"Wykryto kolizje: {len(issues)}\n\n{details}")
+
+    def _show_analysis(self, analysis):
+        details = "".join(
+            f"{name}: {self._format_time(seconds)}\n"
+            for name, seconds in zip(MOVE_NAMES, analysis['type_times'])
+        )
+        operations = analysis['operation_times']
+        for i, (line, seconds) in enumerate(operations[:MAX_LISTED_OPERATIONS], start=1):
+            details += f"Operacja {i} (linia {int(line) + 1}): {self._format_time(seconds)}\n"
+        if len(operations) > MAX_LISTED_OPERATIONS:
+            details += f"... i {len(operations) - MAX_LISTED_OPERATIONS} kolejnych operacji\n"
+        messagebox.showinfo(
+            "Czas obróbki", 
+            f"Szacowany czas: {self._format_time(analysis['time'])}\n\n{details}"
+        )
 
             
 
@@ -0,0 +1,158 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from itertools import cycle, islice
+import numpy as np
+from function_occ import GCodeParser, ModalState, MOVE_ARC
+from estimator_occ import TimeEstimator
+from trail_occ import TrailBuffer
+from simulation_occ import MachiningSimulation, START_POSITION
+from stock_occ import DEFAULT_ENGINE, STOCK_ENGINES
+import toolpath_occ as tp
+
+BENCH_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BENCH_STOCK = (300.0, 200.0, 30.0)
+BENCH_TILE = (60.0, 25.0)
+BENCH_PHASES = ('parse', 'estimate', 'trail', 'removal')
+# Usuwanie materiału idzie ruch po ruchu w Pythonie, więc dla największych programów trwałoby godzinami.
+BENCH_REMOVAL_LINES = 100_000
+REGRESSION_THRESHOLD = 0.2
+MIN_COMPARED_SECONDS = 0.01
+
+
+def _tile(x, y):
+    return ["T1 M6 ; SREDNICA 4"] + tp.gcode_lines(np.concatenate([
+        tp.rectangular_pocket(x + 2, y + 2, 16, 12, 3, 1, 2000, 2),
+        tp.circular_pocket(x + 30, y + 10, 12, 3, 1, 1500, 2),
+        tp.drill(x + 45, y + 5, 5, 300),
+        tp.waypoint(tp.CODE_RAPID, x=x + 40, y=y + 15, z=tp.SAFE_Z),
+        tp.waypoint(tp.CODE_FEED, z=-1, f=800),
+        tp.waypoint(tp.CODE_SPINDLE_ON),
+        tp.waypoint(tp.CODE_ARC_CW, x=x + 50, y=y + 15, i=5, j=0),
+        tp.waypoint(tp.CODE_SPINDLE_OFF),
+        tp.waypoint(tp.CODE_RAPID, z=tp.SAFE_Z)
+    ]))
+
+
+def synthetic_program(lines, length=BENCH_STOCK[0], width=BENCH_STOCK[1]):
+    tiles = [
+        _tile(x, y)
+        for y in np.arange(0.0, width - BENCH_TILE[1] + 1e-9, BENCH_TILE[1])
+        for x in np.arange(0.0, length - BENCH_TILE[0] + 1e-9, BENCH_TILE[0])
+    ]
+    commands = (command for tile in cycle(tiles) for command in tile)
+    return list(islice(commands, lines))
+
+
+def _phases(program, engine):
+    data = "\n".join(program).encode('utf-8')
+    state = {}
+
+    def parse():
+        state['moves'] = GCodeParser.parse_program(data, ModalState(START_POSITION))
+
+    def estimate():
+        TimeEstimator.estimate(state['moves'], START_POSITION)
+
+    def trail():
+        moves = state['moves']
+        motion = moves[moves['type'] <= MOVE_ARC]
+        TrailBuffer(tolerance=0.01).extend(np.column_stack((motion['x'], motion['y'], motion['z'])))
+
+    def removal():
+        MachiningSimulation(BENCH_STOCK[1], BENCH_STOCK[0], BENCH_STOCK[2], engine).run(state['moves'])
+
+    return {'parse': parse, 'estimate': estimate, 'trail': trail, 'removal': removal}
+
+
+def run_benchmarks(sizes=BENCH_SIZES, phases=BENCH_PHASES, engine=DEFAULT_ENGINE, repeat=1, memory=True,
+                   removal_lines=BENCH_REMOVAL_LINES):
+    results = []
+    for lines in sizes:
+        program = synthetic_program(lines)
+        steps = _phases(program, engine)
+        for phase in phases:
+            if phase == 'removal' and removal_lines is not None and lines > removal_lines:
+                print(f"{lines:>10} {phase:<9} pominięto (limit {removal_lines} linii, --removal-lines)")
+                continue
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                steps[phase]()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+
+            # Pomiar pamięci osobno, bo tracemalloc spowalnia kod w Pythonie.
+            peak = None
+            if memory:
+                tracemalloc.start()
+                steps[phase]()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            results.append({'lines': lines, 'phase': phase, 'seconds': best, 'peak_memory': peak})
+            print(f"{lines:>10} {phase:<9} {best:10.4f} s" + (f" {peak / 2**20:10.1f} MB" if peak is not None else ""))
+    return {
+        'engine': engine,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'results': results
+    }
+
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    reference = {(row['lines'], row['phase']): row for row in baseline['results']}
+    regressions = []
+    for row in report['results']:
+        base = reference.get((row['lines'], row['phase']))
+        # Bardzo krótkie pomiary są zdominowane przez szum i nie są porównywane.
+        if base is None or base['seconds'] < MIN_COMPARED_SECONDS:
+            continue
+        ratio = row['seconds'] / base['seconds']
+        memory_ratio = None
+        if row['peak_memory'] and base.get('peak_memory'):
+            memory_ratio = row['peak_memory'] / base['peak_memory']
+        slower = ratio > 1 + threshold or (memory_ratio is not None and memory_ratio > 1 + threshold)
+        if slower:
+            regressions.append({'lines': row['lines'], 'phase': row['phase'], 'time': ratio, 'memory': memory_ratio})
+        print(
+            f"{row['lines']:>10} {row['phase']:<9} czas x{ratio:.2f}"
+            + (f", pamięć x{memory_ratio:.2f}" if memory_ratio is not None else "")
+            + (" REGRESJA" if slower else "")
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Testy wydajności parsera i symulacji")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(BENCH_SIZES), help="liczby linii programów")
+    parser.add_argument('--phases', nargs='+', choices=BENCH_PHASES, default=list(BENCH_PHASES))
+    parser.add_argument('--engine', choices=sorted(STOCK_ENGINES), default=DEFAULT_ENGINE)
+    parser.add_argument('--repeat', type=int, default=1, help="liczba powtórzeń (liczy się najlepszy czas)")
+    parser.add_argument('--no-memory', action='store_true', help="bez pomiaru szczytowego zużycia pamięci")
+    parser.add_argument('--removal-lines', type=int, default=BENCH_REMOVAL_LINES,
+                        help="największy program dla fazy usuwania materiału (0 = bez limitu)")
+    parser.add_argument('--output', help="zapis wyników do pliku JSON")
+    parser.add_argument('--baseline', help="plik JSON z wynikami odniesienia")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="dopuszczalny wzrost (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.sizes, args.phases, args.engine, args.repeat, not args.no_memory, args.removal_lines or None
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"Wykryto regresje: {len(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,340 @@
+import math
+import os
+import time
+import tempfile
+import zlib
+import numpy as np
+from OCC.Core.gp import gp_Pnt, gp_Vec, gp_Trsf, gp_Dir, gp_Ax1, gp_Ax2, gp_Circ
+from OCC.Core.GC import GC_MakeArcOfCircle
+from OCC.Core.BRepPrimAPI import (
+    BRepPrimAPI_MakeBox, BRepPrimAPI_MakeCylinder, BRepPrimAPI_MakePrism, BRepPrimAPI_MakeRevol
+)
+from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Cut
+from OCC.Core.BRepBuilderAPI import (
+    BRepBuilderAPI_Transform, BRepBuilderAPI_MakePolygon, BRepBuilderAPI_MakeFace,
+    BRepBuilderAPI_MakeEdge, BRepBuilderAPI_MakeWire
+)
+from OCC.Core.TopTools import TopTools_ListOfShape
+from OCC.Core.BRep import BRep_Builder
+from OCC.Core.Poly import Poly_Triangulation, Poly_Triangle
+from OCC.Core.TopoDS import TopoDS_Face, TopoDS_Shape
+from OCC.Core.BRepTools import breptools
+from OCC.Core.BRepGProp import brepgprop
+from OCC.Core.GProp import GProp_GProps
+from OCC.Core.TopLoc import TopLoc_Location
+from function_occ import GCodeParser, ARC_TOLERANCE
+from stock_occ import Stock
+
+BATCH_SIZE = 32
+BATCH_FUZZY = 1e-5
+
+
+def make_box(length, width, height):
+    box = BRepPrimAPI_MakeBox(length, width, height).Shape()
+    translation = gp_Trsf()
+    translation.SetTranslation(gp_Vec(0, 0, -height))
+    return box.Moved(TopLoc_Location(translation))
+
+
+def _triangulation(vertices, triangles):
+    triangulation = Poly_Triangulation(len(vertices), len(triangles), False)
+    for i, (x, y, z) in enumerate(vertices.tolist(), start=1):
+        triangulation.SetNode(i, gp_Pnt(x, y, z))
+    for i, (a, b, c) in enumerate((triangles + 1).tolist(), start=1):
+        triangulation.SetTriangle(i, Poly_Triangle(a, b, c))
+    return triangulation
+
+
+def _face(triangulation):
+    face = TopoDS_Face()
+    BRep_Builder().MakeFace(face, triangulation)
+    return face
+
+
+class GridMesh:
+    # Siatka Z-map ma stałą topologię, więc triangulacja powstaje raz, a przy odświeżeniu
+    # zmieniane są tylko wysokości węzłów, które narzędzie obniżyło od poprzedniej klatki.
+    _last = None
+
+    @staticmethod
+    def shared(field):
+        # Kolejne animacje na półfabrykacie tego samego rozmiaru korzystają z tej samej triangulacji.
+        mesh = GridMesh._last
+        if mesh is None or mesh.grid != (field.x.tobytes(), field.y.tobytes()):
+            mesh = GridMesh._last = GridMesh(field)
+        return mesh
+
+    def __init__(self, field):
+        self.grid = (field.x.tobytes(), field.y.tobytes())
+        vertices, triangles = field.mesh()
+        self.x = vertices[:, 0].copy()
+        self.y = vertices[:, 1].copy()
+        self.z = vertices[:, 2].copy()
+        self.triangulation = _triangulation(vertices, triangles)
+
+    def update(self, z):
+        z = z.ravel()
+        changed = np.flatnonzero(z != self.z)
+        nodes = zip(
+            (changed + 1).tolist(), self.x[changed].tolist(), self.y[changed].tolist(), z[changed].tolist()
+        )
+        for i, x, y, height in nodes:
+            self.triangulation.SetNode(i, gp_Pnt(x, y, height))
+        self.z[changed] = z[changed]
+        return _face(self.triangulation)
+
+
+def cut_shapes(shape, tools, parallel=False, fuzzy=0.0):
+    arguments = TopTools_ListOfShape()
+    arguments.Append(shape)
+    tool_list = TopTools_ListOfShape()
+    for tool in tools:
+        tool_list.Append(tool)
+
+    cut = BRepAlgoAPI_Cut()
+    cut.SetArguments(arguments)
+    cut.SetTools(tool_list)
+    cut.SetRunParallel(parallel)
+    if fuzzy > 0:
+        cut.SetFuzzyValue(fuzzy)
+    cut.Build()
+    if not cut.IsDone():
+        return None
+    return cut.Shape()
+
+
+def _cylinder(position, radius, length):
+    axis = gp_Ax2(gp_Pnt(*position), gp_Dir(0, 0, 1))
+    return BRepPrimAPI_MakeCylinder(axis, radius, length).Shape()
+
+
+def _disk(position, radius):
+    circle = gp_Circ(gp_Ax2(gp_Pnt(*position), gp_Dir(0, 0, 1)), radius)
+    wire = BRepBuilderAPI_MakeWire(BRepBuilderAPI_MakeEdge(circle).Edge()).Wire()
+    return BRepBuilderAPI_MakeFace(wire).Face()
+
+
+def _polygon_face(points):
+    polygon = BRepBuilderAPI_MakePolygon()
+    for point in points:
+        polygon.Add(gp_Pnt(*point))
+    polygon.Close()
+    return BRepBuilderAPI_MakeFace(polygon.Wire()).Face()
+
+
+def _stadium_face(start, end, radius):
+    x0, y0, z = start
+    x1, y1 = end[0], end[1]
+    distance = math.hypot(x1 - x0, y1 - y0)
+    ux = (x1 - x0) / distance
+    uy = (y1 - y0) / distance
+    nx = -uy * radius
+    ny = ux * radius
+
+    a = gp_Pnt(x0 + nx, y0 + ny, z)
+    b = gp_Pnt(x1 + nx, y1 + ny, z)
+    c = gp_Pnt(x1 - nx, y1 - ny, z)
+    d = gp_Pnt(x0 - nx, y0 - ny, z)
+    front = gp_Pnt(x1 + ux * radius, y1 + uy * radius, z)
+    back = gp_Pnt(x0 - ux * radius, y0 - uy * radius, z)
+
+    wire = BRepBuilderAPI_MakeWire()
+    wire.Add(BRepBuilderAPI_MakeEdge(a, b).Edge())
+    wire.Add(BRepBuilderAPI_MakeEdge(GC_MakeArcOfCircle(b, front, c).Value()).Edge())
+    wire.Add(BRepBuilderAPI_MakeEdge(c, d).Edge())
+    wire.Add(BRepBuilderAPI_MakeEdge(GC_MakeArcOfCircle(d, back, a).Value()).Edge())
+    return BRepBuilderAPI_MakeFace(wire.Wire()).Face()
+
+
+def linear_sweep(start, end, radius, length):
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    dz = end[2] - start[2]
+    horizontal = math.hypot(dx, dy)
+    if horizontal < 1e-9:
+        return [_cylinder((start[0], start[1], min(start[2], end[2])), radius, abs(dz) + length)]
+    if abs(dz) < 1e-9:
+        return [BRepPrimAPI_MakePrism(_stadium_face(start, end, radius), gp_Vec(0, 0, length)).Shape()]
+
+    # Przy ruchu ukośnym objętość omiatana to otoczka wypukła narzędzia w obu końcach:
+    # oba walce oraz pryzmaty podstawy, wierzchu i przekroju osiowego wzdłuż ruchu.
+    x, y, z = start
+    nx = -dy / horizontal * radius
+    ny = dx / horizontal * radius
+    section = _polygon_face([
+        (x - nx, y - ny, z), (x + nx, y + ny, z),
+        (x + nx, y + ny, z + length), (x - nx, y - ny, z + length)
+    ])
+    direction = gp_Vec(dx, dy, dz)
+    return [
+        _cylinder(start, radius, length),
+        _cylinder(end, radius, length),
+        BRepPrimAPI_MakePrism(section, direction).Shape(),
+        BRepPrimAPI_MakePrism(_disk(start, radius), direction).Shape(),
+        BRepPrimAPI_MakePrism(_disk((x, y, z + length), radius), direction).Shape()
+    ]
+
+
+def arc_sweep(center, arc_radius, start_angle, end_angle, z, radius, length):
+    sweep = end_angle - start_angle
+    inner = arc_radius - radius
+    outer = arc_radius + radius
+    cos_a = math.cos(start_angle)
+    sin_a = math.sin(start_angle)
+    section = _polygon_face([
+        (center[0] + inner * cos_a, center[1] + inner * sin_a, z),
+        (center[0] + outer * cos_a, center[1] + outer * sin_a, z),
+        (center[0] + outer * cos_a, center[1] + outer * sin_a, z + length),
+        (center[0] + inner * cos_a, center[1] + inner * sin_a, z + length)
+    ])
+    axis = gp_Ax1(gp_Pnt(center[0], center[1], z), gp_Dir(0, 0, 1 if sweep > 0 else -1))
+    ring = BRepPrimAPI_MakeRevol(section, axis, min(abs(sweep), 2 * math.pi)).Shape()
+
+    start = (center[0] + arc_radius * cos_a, center[1] + arc_radius * sin_a, z)
+    end = (center[0] + arc_radius * math.cos(end_angle), center[1] + arc_radius * math.sin(end_angle), z)
+    return [ring, _cylinder(start, radius, length), _cylinder(end, radius, length)]
+
+
+class BRepStock(Stock):
+    # Operacja boolowska jest metodą półfabrykatu, żeby profiler mierzył tylko ten obiekt.
+    cut_shapes = staticmethod(cut_shapes)
+
+    def __init__(self, length, width, height, arc_tolerance=ARC_TOLERANCE):
+        super().__init__(arc_tolerance)
+        self.current_shape = make_box(length, width, height)
+        self._tools = {}
+
+    def tool_shape(self, radius, length):
+        key = (radius, length)
+        if key not in self._tools:
+            self._tools[key] = BRepPrimAPI_MakeCylinder(radius, length).Shape()
+        return self._tools[key]
+
+    def cut(self, start, end, radius, length):
+        if end[2] > 0:
+            return False
+        trsf = gp_Trsf()
+        trsf.SetTranslation(gp_Vec(*end))
+        moved_tool = BRepBuilderAPI_Transform(self.tool_shape(radius, length), trsf).Shape()
+        return self._apply([moved_tool])
+
+    def _apply(self, tools):
+        shape = self.cut_shapes(self.current_shape, tools)
+        if shape is None:
+            return False
+        self.current_shape = shape
+        return True
+
+    def shape(self):
+        return self.current_shape
+
+    def volume(self):
+        self.flush()
+        properties = GProp_GProps()
+        brepgprop.VolumeProperties(self.current_shape, properties)
+        return properties.Mass()
+
+    def snapshot(self):
+        self.flush()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stock.brep')
+            breptools.Write(self.current_shape, path)
+            with open(path, 'rb') as f:
+                return zlib.compress(f.read(), 1)
+
+    def restore(self, data):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stock.brep')
+            with open(path, 'wb') as f:
+                f.write(zlib.decompress(data))
+            shape = TopoDS_Shape()
+            breptools.Read(shape, path, BRep_Builder())
+        self.current_shape = shape
+
+
+class BatchedStock(BRepStock):
+    def __init__(self, length, width, height, arc_tolerance=ARC_TOLERANCE, batch_size=BATCH_SIZE,
+                 fuzzy=BATCH_FUZZY):
+        super().__init__(length, width, height, arc_tolerance)
+        self.batch_size = batch_size
+        self.fuzzy = fuzzy
+        self.pending = []
+        self.queued_at = []
+        self.batches = []
+
+    def _apply(self, tools):
+        now = time.perf_counter()
+        self.pending.extend(tools)
+        self.queued_at.extend(now for _ in tools)
+        if self.batch_size is None or len(self.pending) < self.batch_size:
+            return False
+        return self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return False
+        start = time.perf_counter()
+        shape = self.cut_shapes(self.current_shape, self.pending, parallel=True, fuzzy=self.fuzzy)
+        end = time.perf_counter()
+        self.batches.append((len(self.pending), end - start, sum(end - t for t in self.queued_at)))
+        self.pending = []
+        self.queued_at = []
+        if shape is None:
+            return False
+        self.current_shape = shape
+        return True
+
+    def restore(self, data):
+        self.pending = []
+        self.queued_at = []
+        super().restore(data)
+
+    def report(self):
+        tools = sum(count for count, _, _ in self.batches)
+        cut_time = sum(seconds for _, seconds, _ in self.batches)
+        return {
+            'batch_size': self.batch_size,
+            'batches': len(self.batches),
+            'tools': tools,
+            'cut_time': cut_time,
+            'throughput': tools / cut_time if cut_time > 0 else 0.0,
+            'mean_latency': sum(wait for _, _, wait in self.batches) / tools if tools else 0.0
+        }
+
+
+def compare_batch_sizes(length, width, height, positions, radius, tool_length, sizes=(1, 8, 32, 128, None)):
+    reports = []
+    for size in sizes:
+        stock = BatchedStock(length, width, height, batch_size=size)
+        for position in positions:
+            stock.cut(position, position, radius, tool_length)
+        stock.flush()
+        reports.append(stock.report())
+    return reports
+
+
+class SweptStock(BRepStock):
+    stepwise = False
+
+    def cut(self, start, end, radius, length):
+        if min(start[2], end[2]) > 0:
+            return False
+        return self._apply(linear_sweep(start, end, radius, length))
+
+    def cut_line(self, start, end, radius, length):
+        return self.cut(start, end, radius, length)
+
+    def cut_arc(self, center, arc_radius, start_angle, end_angle, start_z, end_z, radius, length):
+        if min(start_z, end_z) > 0:
+            return False
+        if abs(end_z - start_z) < 1e-9 and arc_radius > radius:
+            return self._apply(arc_sweep(center, arc_radius, start_angle, end_angle, start_z, radius, length))
+
+        # Łuk śrubowy lub narzędzie szersze niż promień łuku - cięciwy, ale nadal jedna operacja.
+        points = GCodeParser.arc_points(
+            center, arc_radius, start_angle, end_angle, start_z, end_z, radius, self.arc_tolerance
+        ).tolist()
+        tools = []
+        for start, end in zip(points[:-1], points[1:]):
+            tools.extend(linear_sweep(start, end, radius, length))
+        return self._apply(tools)
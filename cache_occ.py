@@ -0,0 +1,90 @@
+import hashlib
+import os
+import numpy as np
+from function_occ import PARSER_VERSION, ARC_TOLERANCE
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "symulacja_frezowania")
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_HASH_LINES = 65536
+
+
+class ProgramCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, program, tolerance=ARC_TOLERANCE):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"parser-{PARSER_VERSION} tolerance-{tolerance!r}\n".encode())
+        for i, block in enumerate(self._iter_bytes(program)):
+            if i:
+                digest.update(b"\n")
+            digest.update(block)
+        return digest.hexdigest()
+
+    def _iter_bytes(self, program):
+        if hasattr(program, 'iter_blocks'):
+            yield from program.iter_blocks()
+            return
+        lines = list(program)
+        for start in range(0, len(lines), CACHE_HASH_LINES):
+            yield "\n".join(lines[start:start + CACHE_HASH_LINES]).encode('utf-8')
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                entry = {
+                    name: data[name].item() if data[name].ndim == 0 else data[name]
+                    for name in data.files
+                }
+            os.utime(path)
+            return entry
+        except Exception as e:
+            print(f"Uszkodzony wpis pamięci podręcznej {path}: {e}")
+            self._remove(path)
+            return None
+
+    def store(self, key, **analysis):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **analysis)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Nie można zapisać pamięci podręcznej: {e}")
+            self._remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
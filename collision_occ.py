@@ -0,0 +1,117 @@
+import numpy as np
+from function_occ import GCodeParser, ARC_TOLERANCE, RAPID_FEEDRATE, MOVE_G00, MOVE_G01, MOVE_ARC
+from zmap_occ import HeightField, ZMAP_RESOLUTION
+
+INDEX_CELL = 5.0
+COLLISION_TOLERANCE = 0.01
+
+
+def move_boxes(moves, start, radii):
+    end = np.column_stack((moves['x'], moves['y']))
+    low = np.minimum(start[:, :2], end) - radii[:, None]
+    high = np.maximum(start[:, :2], end) + radii[:, None]
+
+    # Dla łuków wystarcza ramka całego okręgu, indeks i tak tylko zawęża kandydatów.
+    arc = moves['type'] == MOVE_ARC
+    center = np.column_stack((moves['cx'], moves['cy']))[arc]
+    reach = (moves['radius'][arc] + radii[arc])[:, None]
+    low[arc] = center - reach
+    high[arc] = center + reach
+    return low, high
+
+
+class MoveIndex:
+    def __init__(self, low, high, ids, cell=INDEX_CELL):
+        self.cell = cell
+        self.low = low
+        self.high = high
+        first = np.floor(low / cell).astype(np.int64)
+        last = np.floor(high / cell).astype(np.int64)
+        spans = last - first + 1
+        counts = spans[:, 0] * spans[:, 1]
+
+        # Każdy ruch trafia do wszystkich komórek siatki, które przecina jego ramka.
+        owner = np.repeat(np.arange(len(ids)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        columns = np.repeat(spans[:, 0], counts)
+        cx = np.repeat(first[:, 0], counts) + offset % columns
+        cy = np.repeat(first[:, 1], counts) + offset // columns
+        keys = self._keys(cx, cy)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.owners = owner[order]
+        self.ids = ids
+
+    @staticmethod
+    def _keys(cx, cy):
+        return (cx << 32) + (cy & 0xFFFFFFFF)
+
+    def query(self, low, high):
+        first = np.floor(np.asarray(low) / self.cell).astype(np.int64)
+        last = np.floor(np.asarray(high) / self.cell).astype(np.int64)
+        cx, cy = np.meshgrid(np.arange(first[0], last[0] + 1), np.arange(first[1], last[1] + 1))
+        keys = self._keys(cx.ravel(), cy.ravel())
+        starts = np.searchsorted(self.keys, keys, side='left')
+        ends = np.searchsorted(self.keys, keys, side='right')
+        if not (ends > starts).any():
+            return self.ids[:0]
+        owners = np.unique(np.concatenate([self.owners[a:b] for a, b in zip(starts, ends)]))
+        overlap = np.all((self.low[owners] <= high) & (self.high[owners] >= low), axis=1)
+        return self.ids[owners[overlap]]
+
+
+def _replay(field, move, start, radius, arc_tolerance):
+    if move['type'] == MOVE_ARC:
+        points = GCodeParser.arc_points(
+            (float(move['cx']), float(move['cy'])), float(move['radius']),
+            float(move['start_angle']), float(move['end_angle']),
+            start[2], float(move['z']), radius, arc_tolerance
+        )
+        field.cut_path(points, radius)
+    else:
+        field.cut(start, (float(move['x']), float(move['y']), float(move['z'])), radius)
+
+
+def find_collisions(moves, length, width, height, start_position=(0.0, 0.0, 5.0), tool_radius=2.0,
+                    tool_length=10.0, arc_tolerance=ARC_TOLERANCE, resolution=ZMAP_RESOLUTION):
+    start = GCodeParser.start_points(moves, start_position)
+    radii = GCodeParser.tool_radii(moves, tool_radius)
+    low, high = move_boxes(moves, start, radii)
+    types = moves['type']
+    lowest = np.minimum(start[:, 2], moves['z'])
+    inside = (high[:, 0] > 0) & (low[:, 0] < length) & (high[:, 1] > 0) & (low[:, 1] < width) & (lowest < 0)
+    descending = moves['z'] < start[:, 2]
+    horizontal = np.hypot(moves['x'] - start[:, 0], moves['y'] - start[:, 1])
+
+    cutting = inside & ((types == MOVE_G01) | (types == MOVE_ARC))
+    rapid = inside & (types == MOVE_G00)
+    fast_plunge = cutting & (types == MOVE_G01) & descending & (moves['f'] >= RAPID_FEEDRATE)
+    shank = cutting & (-lowest > tool_length)
+
+    issues = [
+        {'line': int(moves['line'][i]), 'kind': 'shank', 'depth': float(-lowest[i] - tool_length)}
+        for i in np.flatnonzero(shank)
+    ]
+    suspects = np.flatnonzero(rapid | fast_plunge)
+    if len(suspects) == 0:
+        return issues
+
+    # Ruchy szybkie są sprawdzane tylko względem tych ruchów skrawających, które indeks
+    # przestrzenny wskaże w ich pobliżu; materiał jest odtwarzany w lokalnym wycinku półfabrykatu.
+    cuts = np.flatnonzero(cutting)
+    index = MoveIndex(low[cuts], high[cuts], cuts)
+    for i in suspects:
+        x0, y0 = max(low[i, 0], 0.0), max(low[i, 1], 0.0)
+        x1, y1 = min(high[i, 0], length), min(high[i, 1], width)
+        field = HeightField(x1 - x0, y1 - y0, height, resolution, origin=(x0, y0))
+        candidates = index.query(low[i], high[i])
+        for j in candidates[candidates < i]:
+            _replay(field, moves[j], tuple(start[j]), radii[j], arc_tolerance)
+
+        depth = field.penetration(tuple(start[i]), (moves['x'][i], moves['y'][i], moves['z'][i]), radii[i])
+        if depth > COLLISION_TOLERANCE:
+            plunge = fast_plunge[i] or (descending[i] and horizontal[i] < 1e-9)
+            issues.append({'line': int(moves['line'][i]), 'kind': 'plunge' if plunge else 'rapid', 'depth': depth})
+
+    issues.sort(key=lambda issue: issue['line'])
+    return issues
@@ -0,0 +1,139 @@
+import numpy as np
+from function_occ import (
+    GCodeParser, ARC_TOLERANCE, RAPID_FEEDRATE,
+    MOVE_G00, MOVE_G01, MOVE_ARC, MOVE_TOOL_CHANGE, MOVE_SPINDLE_START
+)
+
+MOVE_NAMES = ('G00', 'G01', 'ARC')
+
+
+class MachineLimits:
+    def __init__(self, rapid_rate=(RAPID_FEEDRATE, RAPID_FEEDRATE, RAPID_FEEDRATE),
+                 acceleration=(500.0, 500.0, 200.0), junction_deviation=0.02):
+        self.rapid_rate = np.array(rapid_rate, dtype=np.float64) / 60
+        self.acceleration = np.array(acceleration, dtype=np.float64)
+        self.junction_deviation = junction_deviation
+
+
+def _axis_limit(limits, direction):
+    # Największa wartość wzdłuż kierunku, przy której żadna oś nie przekracza swojego limitu.
+    with np.errstate(divide='ignore'):
+        ratio = limits / np.abs(direction)
+    return np.minimum(np.minimum(ratio[:, 0], ratio[:, 1]), ratio[:, 2])
+
+
+def _arc_tangent(angle, sweep, length_xy, dz):
+    sign = np.where(sweep >= 0, 1.0, -1.0)
+    tangent = np.column_stack((-np.sin(angle) * sign * length_xy, np.cos(angle) * sign * length_xy, dz))
+    return tangent / np.maximum(np.linalg.norm(tangent, axis=1), 1e-12)[:, None]
+
+
+class TimeEstimator:
+    @staticmethod
+    def feed_time(moves, start_position=(0.0, 0.0, 5.0), tool_radius=2.0, tolerance=ARC_TOLERANCE):
+        distance = GCodeParser.move_lengths(moves, start_position, tool_radius, tolerance)
+        cutting = ((moves['type'] == MOVE_G01) | (moves['type'] == MOVE_ARC)) & (moves['f'] > 0)
+        return float(np.sum(distance[cutting] / moves['f'][cutting])) * 60
+
+    @staticmethod
+    def estimate(moves, start_position=(0.0, 0.0, 5.0), limits=None, tool_radius=2.0,
+                 tolerance=ARC_TOLERANCE):
+        if limits is None:
+            limits = MachineLimits()
+
+        start = GCodeParser.start_points(moves, start_position)
+        length = GCodeParser.move_lengths(moves, start_position, tool_radius, tolerance)
+        stop = (moves['type'] > MOVE_ARC) | ((moves['type'] != MOVE_G00) & (moves['f'] <= 0))
+        segment = np.flatnonzero(~stop & (length > 1e-9))
+
+        # Zmiana narzędzia, M3/M5 i ruch bez posuwu zatrzymują maszynę.
+        stopped = np.diff(np.cumsum(stop)[segment]) > 0
+        if not len(segment):
+            return TimeEstimator._summary(moves, np.zeros(len(moves)))
+
+        move_type = moves['type'][segment]
+        feedrate = moves['f'][segment]
+        radius = moves['radius'][segment]
+        distance = length[segment]
+        delta = np.column_stack((moves['x'][segment], moves['y'][segment], moves['z'][segment])) - start[segment]
+        is_arc = move_type == MOVE_ARC
+
+        entry = delta / distance[:, None]
+        exit_ = entry.copy()
+        if is_arc.any():
+            arc = segment[is_arc]
+            start_angle = moves['start_angle'][arc]
+            end_angle = moves['end_angle'][arc]
+            sweep = end_angle - start_angle
+            length_xy = radius[is_arc] * np.abs(sweep)
+            dz = delta[is_arc, 2]
+            entry[is_arc] = _arc_tangent(start_angle, sweep, length_xy, dz)
+            exit_[is_arc] = _arc_tangent(end_angle, sweep, length_xy, dz)
+
+        # Łuk obciąża obie osie płaszczyzny XY, więc liczy się limit słabszej z nich.
+        direction = entry.copy()
+        direction[is_arc, :2] = 1.0
+        acceleration = _axis_limit(limits.acceleration, direction)
+        velocity = _axis_limit(limits.rapid_rate, direction)
+        velocity = np.where(move_type == MOVE_G00, velocity, np.minimum(velocity, feedrate / 60))
+        velocity[is_arc] = np.minimum(velocity[is_arc], np.sqrt(acceleration[is_arc] * radius[is_arc]))
+
+        # Prędkość na styku odcinków wg odchyłki naroża (junction deviation).
+        cos_theta = -np.sum(exit_[:-1] * entry[1:], axis=1)
+        sin_half = np.sqrt(np.clip(0.5 * (1 - cos_theta), 0.0, 1.0))
+        junction_acceleration = np.minimum(acceleration[:-1], acceleration[1:])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            junction = junction_acceleration * limits.junction_deviation * sin_half / (1 - sin_half)
+        junction = np.where(cos_theta > 0.999999, 0.0, junction)
+        junction = np.where(cos_theta < -0.999999, np.inf, junction)
+        junction = np.minimum(junction, np.minimum(velocity[:-1], velocity[1:]) ** 2)
+        junction[stopped] = 0.0
+
+        squared = np.concatenate(([0.0], junction, [0.0]))
+        reach = 2 * acceleration * distance
+        offset = np.concatenate(([0.0], np.cumsum(reach)))
+        squared = np.minimum.accumulate((squared + offset)[::-1])[::-1] - offset
+        squared = np.minimum.accumulate(squared - offset) + offset
+        speed = np.sqrt(np.clip(squared, 0.0, None))
+
+        v0 = speed[:-1]
+        v1 = speed[1:]
+        accelerating = (velocity**2 - v0**2) / (2 * acceleration)
+        decelerating = (velocity**2 - v1**2) / (2 * acceleration)
+        cruise = distance - accelerating - decelerating
+        peak = np.where(
+            cruise >= 0,
+            velocity,
+            np.sqrt(np.clip((reach + v0**2 + v1**2) / 2, 0.0, None))
+        )
+        peak = np.maximum(peak, np.maximum(v0, v1))
+        segment_time = (peak - v0) / acceleration + (peak - v1) / acceleration + np.clip(cruise, 0.0, None) / velocity
+
+        move_times = np.zeros(len(moves))
+        move_times[segment] = segment_time
+        return TimeEstimator._summary(moves, move_times)
+
+    @staticmethod
+    def _summary(moves, move_times):
+        move_type = moves['type']
+        operation = np.cumsum((move_type == MOVE_TOOL_CHANGE) | (move_type == MOVE_SPINDLE_START))
+        operation_time = np.bincount(operation, weights=move_times)
+        starts = np.searchsorted(operation, np.arange(len(operation_time)))
+        used = np.flatnonzero(operation_time > 0)
+        operations = [
+            {
+                'line': int(moves['line'][min(starts[i], len(moves) - 1)]),
+                'time': float(operation_time[i])
+            }
+            for i in used
+        ]
+
+        return {
+            'total': float(move_times.sum()),
+            'by_type': {
+                name: float(move_times[move_type == code].sum())
+                for code, name in zip((MOVE_G00, MOVE_G01, MOVE_ARC), MOVE_NAMES)
+            },
+            'operations': operations,
+            'move_times': move_times
+        }
@@ -0,0 +1,119 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from function_occ import GCodeParser, ModalState, ARC_TOLERANCE
+from estimator_occ import TimeEstimator
+from io_occ import open_program, COMPRESSED_OPENERS
+from collision_occ import find_collisions
+from stock_occ import DEFAULT_ENGINE, STOCK_ENGINES
+from simulation_occ import MachiningSimulation, START_POSITION
+
+PROGRAM_PATTERNS = ('*.gcode', '*.nc', '*.txt') + tuple(f'*.gcode{extension}' for extension in COMPRESSED_OPENERS)
+MAX_LISTED_WARNINGS = 20
+SUMMARY_FIELDS = (
+    'file', 'lines', 'moves', 'cycle_time', 'stock_volume', 'removed_volume',
+    'warnings', 'warning_lines', 'wall_time', 'error'
+)
+
+
+def find_programs(target):
+    if os.path.isdir(target):
+        paths = [path for pattern in PROGRAM_PATTERNS for path in glob.glob(os.path.join(target, pattern))]
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(set(path for path in paths if os.path.isfile(path)))
+
+
+def process_program(path, width, length, height, engine=DEFAULT_ENGINE, arc_tolerance=ARC_TOLERANCE):
+    started = time.perf_counter()
+    row = {'file': path}
+    try:
+        with open_program(path) as f:
+            data = f.read()
+        moves = GCodeParser.parse_program(data, ModalState(START_POSITION))
+        estimate = TimeEstimator.estimate(moves, START_POSITION, tolerance=arc_tolerance)
+        issues = find_collisions(moves, length, width, height, START_POSITION, arc_tolerance=arc_tolerance)
+        simulation = MachiningSimulation(width, length, height, engine, arc_tolerance)
+        stock = simulation.run(moves)['stock']
+        volume = stock.volume()
+        # Znak nowej linii na końcu pliku nie rozpoczyna kolejnej linii programu.
+        lines = data.count(b'\n') + (bool(data) and not data.endswith(b'\n'))
+        row.update({
+            'lines': lines,
+            'moves': len(moves),
+            'cycle_time': estimate['total'],
+            'stock_volume': volume,
+            'removed_volume': width * length * height - volume,
+            'warnings': len(issues),
+            'warning_lines': [issue['line'] + 1 for issue in issues[:MAX_LISTED_WARNINGS]],
+            'error': None
+        })
+    except Exception as e:
+        row['error'] = str(e)
+    row['wall_time'] = time.perf_counter() - started
+    return row
+
+
+def run_farm(paths, width, length, height, engine=DEFAULT_ENGINE, arc_tolerance=ARC_TOLERANCE, workers=None):
+    rows = []
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(process_program, path, width, length, height, engine, arc_tolerance)
+            for path in paths
+        ]
+        for future in as_completed(futures):
+            row = future.result()
+            status = f"błąd: {row['error']}" if row['error'] else f"{row['cycle_time']:.1f} s, ostrzeżenia: {row['warnings']}"
+            print(f"{row['file']}: {status}")
+            rows.append(row)
+    rows.sort(key=lambda row: row['file'])
+    return rows
+
+
+def write_summary(rows, path):
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, SUMMARY_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                row = dict(row)
+                row['warning_lines'] = " ".join(str(line) for line in row.get('warning_lines', ()))
+                writer.writerow(row)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wsadowa symulacja programów G-code")
+    parser.add_argument('target', help="katalog lub wzorzec plików (np. 'programy/**/*.gcode')")
+    parser.add_argument('--width', type=float, required=True, help="szerokość półfabrykatu (Y)")
+    parser.add_argument('--length', type=float, required=True, help="długość półfabrykatu (X)")
+    parser.add_argument('--height', type=float, required=True, help="wysokość półfabrykatu (Z)")
+    parser.add_argument('--engine', choices=sorted(STOCK_ENGINES), default=DEFAULT_ENGINE)
+    parser.add_argument('--tolerance', type=float, default=ARC_TOLERANCE, help="tolerancja łuków")
+    parser.add_argument('--workers', type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    parser.add_argument('--output', default='podsumowanie.json', help="plik wynikowy .json lub .csv")
+    args = parser.parse_args(argv)
+
+    paths = find_programs(args.target)
+    if not paths:
+        parser.error(f"Nie znaleziono programów: {args.target}")
+
+    started = time.perf_counter()
+    rows = run_farm(paths, args.width, args.length, args.height, args.engine, args.tolerance, args.workers)
+    write_summary(rows, args.output)
+    failed = sum(1 for row in rows if row['error'])
+    print(
+        f"Przetworzono {len(rows)} programów w {time.perf_counter() - started:.1f} s "
+        f"(błędy: {failed}), podsumowanie zapisano w {args.output}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,140 +1,441 @@
 import math
+import re
+from itertools import islice
+import numpy as np
+
+PARSER_VERSION = 2
+RAPID_FEEDRATE = 5000
+STREAM_CHUNK_LINES = 65536
+INCH = 25.4
+ARC_TOLERANCE = 0.01
+
+MOVE_G00 = 0
+MOVE_G01 = 1
+MOVE_ARC = 2
+MOVE_TOOL_CHANGE = 3
+MOVE_SPINDLE_START = 4
+MOVE_SPINDLE_STOP = 5
+
+MOVE_DTYPE = np.dtype([
+    ('type', np.int8),
+    ('x', np.float64),
+    ('y', np.float64),
+    ('z', np.float64),
+    ('f', np.float64),
+    ('cx', np.float64),
+    ('cy', np.float64),
+    ('radius', np.float64),
+    ('start_angle', np.float64),
+    ('end_angle', np.float64),
+    ('line', np.int64)
+])
+
+_COMMENT = re.compile(rb';[^\n]*|\([^)\n]*\)?')
+_SREDNICA = re.compile(rb'SREDNICA\s*([-+]?\d*\.?\d+)')
+_MAX_NUMBER_WIDTH = 32
+_DIAMETER_WORD = 0
+_AXIS_WORDS = ('X', 'Y', 'Z', 'I', 'J', 'R')
+
+
+class ModalState:
+    def __init__(self, position=(0.0, 0.0, 5.0), feedrate=1000):
+        self.position = [float(v) for v in position]
+        self.feedrate = float(feedrate)
+        self.motion = None
+        self.units_scale = 1.0
+        self.tool = 0
+        self.tool_radius = 2.0
+        self.line = 0
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ModalState)
+            and self.position == other.position
+            and self.feedrate == other.feedrate
+            and self.motion == other.motion
+            and self.units_scale == other.units_scale
+            and self.tool == other.tool
+            and self.tool_radius == other.tool_radius
+        )
+
+    def copy(self):
+        state = ModalState(self.position, self.feedrate)
+        state.motion = self.motion
+        state.units_scale = self.units_scale
+        state.tool = self.tool
+        state.tool_radius = self.tool_radius
+        state.line = self.line
+        return state
+
+
+def _to_float(number):
+    try:
+        return float(number)
+    except ValueError:
+        return np.nan
+
+
+def _forward_fill(values, initial):
+    index = np.where(np.isnan(values), 0, np.arange(1, len(values) + 1))
+    np.maximum.accumulate(index, out=index)
+    return np.concatenate(([initial], values))[index]
+
 
 class GCodeParser:
     @staticmethod
     def parse(command, current_position, current_feedrate):
-        cmd_parts = command.strip().upper().split()
-        if not cmd_parts:
-            return {'type': 'UNKNOWN'}
-        
-        if cmd_parts[0].startswith('F'):
-            try:
-                new_f = float(cmd_parts[0][1:])
-                return {'type': 'UPDATE_FEED', 'f': new_f}
-            except:
-                return {'type': 'UNKNOWN'}
-        
-        gcode = cmd_parts[0]
-        components = {}
-        for part in cmd_parts[1:]:
-            key = part[0]
-            try:
-                components[key] = float(part[1:])
-            except ValueError:
-                continue
-
-        new_feedrate = components.get('F', current_feedrate)
-
-        if gcode in ['G00', 'G0']:
-            return {
-                'type': 'G00',
-                'x': components.get('X', current_position[0]),
-                'y': components.get('Y', current_position[1]),
-                'z': components.get('Z', current_position[2]),
-                'f': 5000 
-            }
-        elif gcode in ['G01', 'G1']:
-            return {
-                'type': 'G01',
-                'x': components.get('X', current_position[0]),
-                'y': components.get('Y', current_position[1]),
-                'z': components.get('Z', current_position[2]),
-                'f': new_feedrate
-            }
-        elif gcode in ['G02', 'G2', 'G03', 'G3']:
-            is_cw = gcode in ['G02', 'G2']
-            try:
-                if 'R' in components:
-                    parsed = GCodeParser._parse_r_notation(components, current_position, is_cw)
-                else:
-                    parsed = GCodeParser._parse_ij_notation(components, current_position, is_cw)
-                
-                parsed.update({
-                    'type': 'ARC',
-                    'x': components.get('X', current_position[0]),
-                    'y': components.get('Y', current_position[1]),
-                    'z': components.get('Z', current_position[2]),
-                    'f': new_feedrate
-                })
-                return parsed
-            except Exception as e:
-                print(f"Błąd parsowania łuku: {str(e)}")
-                return {'type': 'UNKNOWN', 'f': current_feedrate}
-        elif gcode in ['M06', 'M6']:
-            return {
-                'type': 'TOOL_CHANGE',
-                'radius': int(cmd_parts[-1])/2 if cmd_parts else 0
-            }
+        state = ModalState(current_position, current_feedrate)
+        moves = GCodeParser.parse_program([command], state)
+        if len(moves):
+            return GCodeParser.move_as_dict(moves[-1], current_position[2])
+        if state.feedrate != current_feedrate:
+            return {'type': 'UPDATE_FEED', 'f': state.feedrate}
+        return {'type': 'UNKNOWN', 'f': current_feedrate}
+
+    @staticmethod
+    def parse_program(lines, state=None):
+        if state is None:
+            state = ModalState()
+        if isinstance(lines, str):
+            lines = lines.encode('utf-8')
+        if isinstance(lines, bytes):
+            data = lines
+            # Blok z czytnika to co najmniej jedna linia, także pusta.
+            line_count = data.count(b'\n') + 1
         else:
-            return {'type': 'UNKNOWN', 'f': current_feedrate}
+            lines = list(lines)
+            data = "\n".join(lines).encode('utf-8')
+            line_count = len(lines)
+
+        words = GCodeParser.tokenize(data)
+        words['line'] += state.line
+        state.line += line_count
+        return GCodeParser._resolve_words(words, state)
 
     @staticmethod
-    def _parse_r_notation(components, current_pos, is_cw):
-        radius = abs(components['R'])
-        x_target = components.get('X', current_pos[0])
-        y_target = components.get('Y', current_pos[1])
+    def iter_program(lines, state=None, chunk_size=STREAM_CHUNK_LINES):
+        if state is None:
+            state = ModalState()
+        if hasattr(lines, 'iter_blocks'):
+            for block in lines.iter_blocks():
+                yield GCodeParser.parse_program(block, state)
+            return
+        lines = iter(lines)
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                return
+            yield GCodeParser.parse_program(chunk, state)
 
-        dx = x_target - current_pos[0]
-        dy = y_target - current_pos[1]
-        chord_length = math.hypot(dx, dy)
+    @staticmethod
+    def iter_moves(lines, state=None, chunk_size=STREAM_CHUNK_LINES):
+        if state is None:
+            state = ModalState()
+        z = state.position[2]
+        for moves in GCodeParser.iter_program(lines, state, chunk_size):
+            yield from GCodeParser.moves_as_dicts(moves, z)
+            if len(moves):
+                z = float(moves['z'][-1])
 
-        if chord_length > 2 * radius:
-            raise ValueError(f"Promień {radius} za mały dla cięciwy {chord_length}")
+    @staticmethod
+    def moves_as_dicts(moves, start_z=5.0):
+        z = start_z
+        for move in moves:
+            yield GCodeParser.move_as_dict(move, z)
+            z = float(move['z'])
 
-        mid_x = current_pos[0] + dx / 2
-        mid_y = current_pos[1] + dy / 2
+    @staticmethod
+    def move_as_dict(move, start_z):
+        move_type = int(move['type'])
+        if move_type == MOVE_TOOL_CHANGE:
+            return {'type': 'TOOL_CHANGE', 'radius': float(move['radius']), 'line': int(move['line'])}
+        if move_type in (MOVE_SPINDLE_START, MOVE_SPINDLE_STOP):
+            return {'type': 'SPINDLE', 'on': move_type == MOVE_SPINDLE_START, 'line': int(move['line'])}
 
-        perp = [dy, -dx] if is_cw else [-dy, dx]
-        perp_length = math.hypot(*perp)
-        
-        if perp_length > 1e-6:
-            perp = [p/perp_length for p in perp]
+        parsed = {
+            'type': ('G00', 'G01', 'ARC')[move_type],
+            'x': float(move['x']),
+            'y': float(move['y']),
+            'z': float(move['z']),
+            'f': float(move['f']),
+            'line': int(move['line'])
+        }
+        if move_type == MOVE_ARC:
+            parsed.update({
+                'center': [float(move['cx']), float(move['cy']), start_z],
+                'radius': float(move['radius']),
+                'start_angle': float(move['start_angle']),
+                'end_angle': float(move['end_angle']),
+                'is_cw': bool(move['end_angle'] < move['start_angle'])
+            })
+        return parsed
 
-        offset = math.sqrt(radius**2 - (chord_length/2)**2)
-        center_x = mid_x + perp[0] * offset
-        center_y = mid_y + perp[1] * offset
+    @staticmethod
+    def tokenize(data):
+        data = data.upper()
+        diameters = []
 
-        start_angle = math.atan2(current_pos[1] - center_y, current_pos[0] - center_x)
-        end_angle = math.atan2(y_target - center_y, x_target - center_x)
+        def blank(match):
+            size = _SREDNICA.search(match.group())
+            if size:
+                diameters.append((match.start(), float(size.group(1))))
+            return b' ' * (match.end() - match.start())
 
-        return {
-            'center': [center_x, center_y, current_pos[2]],
-            'radius': radius,
-            'start_angle': start_angle,
-            'end_angle': end_angle,
-            'is_cw': is_cw,
-            'steps': 60
-        }
+        if b';' in data or b'(' in data:
+            data = _COMMENT.sub(blank, data)
+
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == ord('\n'))
+        letter = (buf >= ord('A')) & (buf <= ord('Z'))
+        numeric = ((buf >= ord('0')) & (buf <= ord('9'))) | (buf == ord('.')) | (buf == ord('-')) | (buf == ord('+'))
+
+        # Liczba słowa to ciąg znaków liczbowych stojący bezpośrednio za literą.
+        edges = np.flatnonzero(np.diff(numeric.view(np.int8), prepend=0, append=0))
+        starts = edges[0::2]
+        ends = edges[1::2]
+        owned = (starts > 0) & letter[np.maximum(starts - 1, 0)]
+        starts = starts[owned]
+        lengths = ends[owned] - starts
+
+        # Słowa dłuższe niż _MAX_NUMBER_WIDTH znaków nie są poprawnymi liczbami G-code.
+        owned = lengths <= _MAX_NUMBER_WIDTH
+        starts = starts[owned]
+        lengths = lengths[owned]
+        width = int(lengths.max()) if len(lengths) else 1
+        columns = np.arange(width)
+        gather = np.minimum(starts[:, None] + columns, len(buf) - 1)
+        text = np.where(columns < lengths[:, None], buf[gather], 0).astype(np.uint8)
+        numbers = text.view(f'S{width}').ravel()
+        try:
+            values = numbers.astype(np.float64)
+        except ValueError:
+            values = np.array([_to_float(number) for number in numbers], dtype=np.float64)
+
+        valid = ~np.isnan(values)
+        letters = buf[starts - 1][valid]
+        values = values[valid]
+        word_line = np.searchsorted(newlines, starts[valid])
+
+        if diameters:
+            at, sizes = zip(*diameters)
+            letters = np.concatenate((letters, np.full(len(sizes), _DIAMETER_WORD, dtype=np.uint8)))
+            values = np.concatenate((values, sizes))
+            word_line = np.concatenate((word_line, np.searchsorted(newlines, at)))
+            order = np.argsort(word_line, kind='stable')
+            letters, values, word_line = letters[order], values[order], word_line[order]
+
+        new_line = np.diff(word_line, prepend=-1) != 0
+        row = np.cumsum(new_line) - 1
+        row_count = np.count_nonzero(new_line)
+
+        def column(mask):
+            values_column = np.full(row_count, np.nan)
+            values_column[row[mask]] = values[mask]
+            return values_column
+
+        is_g = letters == ord('G')
+        is_m = letters == ord('M')
+        words = {key: column(letters == ord(key)) for key in _AXIS_WORDS + ('F', 'T')}
+        words['D'] = column(letters == _DIAMETER_WORD)
+        words['motion'] = column(is_g & np.isin(values, (0, 1, 2, 3)))
+        words['units'] = column(is_g & np.isin(values, (20, 21)))
+        words['tool_change'] = ~np.isnan(column(is_m & (values == 6)))
+        words['spindle'] = column(is_m & np.isin(values, (3, 4, 5)))
+        words['line'] = word_line[new_line].astype(np.int64)
+        return words
+
+    @staticmethod
+    def _resolve_words(words, state):
+        units = np.select([words['units'] == 20, words['units'] == 21], [INCH, 1.0], np.nan)
+        scale = _forward_fill(units, state.units_scale)
+        motion = _forward_fill(words['motion'], np.nan if state.motion is None else state.motion)
+        feed = _forward_fill(words['F'] * scale, state.feedrate)
+        tool = _forward_fill(words['T'], state.tool)
+        tool_change = words['tool_change']
+        tool_radius = _forward_fill(np.where(tool_change, words['D'] / 2, np.nan), state.tool_radius)
+
+        has_axis = np.zeros(len(motion), dtype=bool)
+        for key in _AXIS_WORDS:
+            has_axis |= ~np.isnan(words[key])
+        move = ~np.isnan(motion) & (~np.isnan(words['motion']) | has_axis)
+        is_cw = motion == 2
+
+        while True:
+            x = _forward_fill(np.where(move, words['X'] * scale, np.nan), state.position[0])
+            y = _forward_fill(np.where(move, words['Y'] * scale, np.nan), state.position[1])
+            z = _forward_fill(np.where(move, words['Z'] * scale, np.nan), state.position[2])
+
+            x0 = np.concatenate(([state.position[0]], x[:-1]))
+            y0 = np.concatenate(([state.position[1]], y[:-1]))
+            z0 = np.concatenate(([state.position[2]], z[:-1]))
+            arcs = np.flatnonzero(move & (motion >= 2))
+            arc = GCodeParser._arc_geometry(
+                x0[arcs], y0[arcs], x[arcs], y[arcs],
+                words['I'][arcs] * scale[arcs], words['J'][arcs] * scale[arcs],
+                words['R'][arcs] * scale[arcs], is_cw[arcs]
+            )
+            if arc['valid'].all():
+                break
+            # Odrzucony łuk zmienia punkt początkowy następnych, więc usuwany jest tylko pierwszy
+            # błędny, a pozostałe są sprawdzane ponownie od nowej pozycji.
+            index = arcs[np.argmin(arc['valid'])]
+            print(f"Błąd parsowania łuku w linii {words['line'][index] + 1}")
+            move[index] = False
+
+        spindle = words['spindle']
+        event_rows = (np.flatnonzero(tool_change), np.flatnonzero(~np.isnan(spindle)), np.flatnonzero(move))
+        kinds = np.repeat([0, 1, 2], [len(event) for event in event_rows])
+        rows = np.concatenate(event_rows)
+        order = np.lexsort((kinds, rows))
+        rows = rows[order]
+        kinds = kinds[order]
+        is_move = kinds == 2
+
+        moves = np.zeros(len(rows), dtype=MOVE_DTYPE)
+        moves['type'] = np.select(
+            [kinds == 0, kinds == 1],
+            [MOVE_TOOL_CHANGE, np.where(spindle[rows] == 5, MOVE_SPINDLE_STOP, MOVE_SPINDLE_START)],
+            np.minimum(motion[rows], MOVE_ARC)
+        )
+        moves['x'] = np.where(is_move, x[rows], x0[rows])
+        moves['y'] = np.where(is_move, y[rows], y0[rows])
+        moves['z'] = np.where(is_move, z[rows], z0[rows])
+        moves['f'] = np.where(moves['type'] == MOVE_G00, RAPID_FEEDRATE, feed[rows])
+        moves['radius'] = np.where(kinds == 0, tool_radius[rows], 0.0)
+        moves['line'] = words['line'][rows]
+
+        arc_rows = np.flatnonzero(moves['type'] == MOVE_ARC)
+        moves['cx'][arc_rows] = arc['cx']
+        moves['cy'][arc_rows] = arc['cy']
+        moves['radius'][arc_rows] = arc['radius']
+        moves['start_angle'][arc_rows] = arc['start_angle']
+        moves['end_angle'][arc_rows] = arc['end_angle']
+
+        if len(motion):
+            state.position = [float(x[-1]), float(y[-1]), float(z[-1])]
+            state.feedrate = float(feed[-1])
+            state.motion = None if np.isnan(motion[-1]) else int(motion[-1])
+            state.units_scale = float(scale[-1])
+            state.tool = int(tool[-1])
+            state.tool_radius = float(tool_radius[-1])
+        return moves
 
     @staticmethod
-    def _parse_ij_notation(components, current_pos, is_cw):
-        x_target = components.get('X', current_pos[0])
-        y_target = components.get('Y', current_pos[1])
-        i_offset = components.get('I', 0.0)
-        j_offset = components.get('J', 0.0)
+    def _arc_geometry(x0, y0, x1, y1, i_offset, j_offset, radius, is_cw):
+        r_notation = ~np.isnan(radius)
 
-        center_x = current_pos[0] + i_offset
-        center_y = current_pos[1] + j_offset
-        radius = math.hypot(i_offset, j_offset)
+        dx = x1 - x0
+        dy = y1 - y0
+        chord_length = np.hypot(dx, dy)
+        r_radius = np.abs(radius)
+        perp_x = np.where(is_cw, dy, -dy)
+        perp_y = np.where(is_cw, -dx, dx)
+        perp_length = np.where(chord_length > 1e-6, chord_length, 1.0)
+        offset = np.sqrt(np.clip(r_radius**2 - (chord_length / 2)**2, 0.0, None))
+        r_cx = x0 + dx / 2 + perp_x / perp_length * offset
+        r_cy = y0 + dy / 2 + perp_y / perp_length * offset
 
-        target_radius = math.hypot(x_target - center_x, y_target - center_y)
-        if not math.isclose(radius, target_radius, rel_tol=1e-3):
-            raise ValueError(f"Cel ({x_target}, {y_target}) nie leży na łuku (promień {radius:.2f})")
+        i_offset = np.nan_to_num(i_offset)
+        j_offset = np.nan_to_num(j_offset)
+        ij_radius = np.hypot(i_offset, j_offset)
+        ij_cx = x0 + i_offset
+        ij_cy = y0 + j_offset
+        target_radius = np.hypot(x1 - ij_cx, y1 - ij_cy)
 
-        start_angle = math.atan2(current_pos[1] - center_y, current_pos[0] - center_x)
-        end_angle = math.atan2(y_target - center_y, x_target - center_x)
+        cx = np.where(r_notation, r_cx, ij_cx)
+        cy = np.where(r_notation, r_cy, ij_cy)
+        valid = np.where(
+            r_notation,
+            chord_length <= 2 * r_radius,
+            np.abs(ij_radius - target_radius) <= 1e-3 * np.maximum(ij_radius, target_radius)
+        )
 
-        angular_dist = end_angle - start_angle
-        if is_cw and angular_dist > -1e-6:
-            angular_dist -= 2 * math.pi
-        elif not is_cw and angular_dist < 1e-6:
-            angular_dist += 2 * math.pi
+        start_angle = np.arctan2(y0 - cy, x0 - cx)
+        angular_dist = np.arctan2(y1 - cy, x1 - cx) - start_angle
+        angular_dist = np.where(is_cw & (angular_dist > -1e-6), angular_dist - 2 * math.pi, angular_dist)
+        angular_dist = np.where(~is_cw & (angular_dist < 1e-6), angular_dist + 2 * math.pi, angular_dist)
 
         return {
-            'center': [center_x, center_y, current_pos[2]],
-            'radius': radius,
+            'cx': cx,
+            'cy': cy,
+            'radius': np.where(r_notation, r_radius, ij_radius),
             'start_angle': start_angle,
             'end_angle': start_angle + angular_dist,
-            'is_cw': is_cw,
-            'steps': max(50, int(abs(angular_dist) * 50))
-        }
\ No newline at end of file
+            'valid': valid
+        }
+
+    @staticmethod
+    def start_points(moves, start_position=(0.0, 0.0, 5.0)):
+        start = np.empty((len(moves), 3))
+        if len(moves):
+            start[0] = start_position
+            start[1:, 0] = moves['x'][:-1]
+            start[1:, 1] = moves['y'][:-1]
+            start[1:, 2] = moves['z'][:-1]
+        return start
+
+    @staticmethod
+    def arc_steps(radius, angular_dist, tool_radius=0.0, tolerance=ARC_TOLERANCE):
+        # Błąd cięciwy liczony na zewnętrznej krawędzi narzędzia.
+        outer_radius = np.maximum(np.asarray(radius) + tool_radius, tolerance)
+        max_angle = 2 * np.arccos(1 - tolerance / outer_radius)
+        steps = np.maximum(1, np.ceil(np.abs(angular_dist) / max_angle)).astype(np.int64)
+        return int(steps) if steps.ndim == 0 else steps
+
+    @staticmethod
+    def arc_points(center, radius, start_angle, end_angle, start_z, end_z, tool_radius=0.0,
+                   tolerance=ARC_TOLERANCE):
+        steps = GCodeParser.arc_steps(radius, end_angle - start_angle, tool_radius, tolerance)
+        angles = np.linspace(start_angle, end_angle, steps + 1)
+        return np.column_stack((
+            center[0] + radius * np.cos(angles),
+            center[1] + radius * np.sin(angles),
+            np.linspace(start_z, end_z, steps + 1)
+        ))
+
+    @staticmethod
+    def tool_radii(moves, tool_radius=2.0):
+        changes = np.where(moves['type'] == MOVE_TOOL_CHANGE, moves['radius'], np.nan)
+        return _forward_fill(changes, tool_radius)
+
+    @staticmethod
+    def move_lengths(moves, start_position=(0.0, 0.0, 5.0), tool_radius=2.0, tolerance=None):
+        start = GCodeParser.start_points(moves, start_position)
+        dx = moves['x'] - start[:, 0]
+        dy = moves['y'] - start[:, 1]
+        dz = moves['z'] - start[:, 2]
+        angular_dist = np.abs(moves['end_angle'] - moves['start_angle'])
+        if tolerance is None:
+            arc_length_xy = moves['radius'] * angular_dist
+        else:
+            steps = GCodeParser.arc_steps(
+                moves['radius'], angular_dist, GCodeParser.tool_radii(moves, tool_radius), tolerance
+            )
+            arc_length_xy = 2 * steps * moves['radius'] * np.sin(angular_dist / (2 * steps))
+        lengths = np.where(
+            moves['type'] == MOVE_ARC,
+            np.sqrt(arc_length_xy**2 + dz**2),
+            np.sqrt(dx**2 + dy**2 + dz**2)
+        )
+        lengths[moves['type'] > MOVE_ARC] = 0.0
+        return lengths
+
+    @staticmethod
+    def bounding_box(moves, start_position=(0.0, 0.0, 5.0)):
+        points = [np.array([start_position], dtype=np.float64)]
+        points.append(np.column_stack((moves['x'], moves['y'], moves['z'])))
+
+        arcs = moves[moves['type'] == MOVE_ARC]
+        sweep = arcs['end_angle'] - arcs['start_angle']
+        for quadrant in range(4):
+            angle = quadrant * math.pi / 2
+            offset = np.where(sweep >= 0, angle - arcs['start_angle'], arcs['start_angle'] - angle)
+            inside = np.mod(offset, 2 * math.pi) <= np.abs(sweep)
+            points.append(np.column_stack((
+                arcs['cx'][inside] + arcs['radius'][inside] * math.cos(angle),
+                arcs['cy'][inside] + arcs['radius'][inside] * math.sin(angle),
+                arcs['z'][inside]
+            )))
+
+        points = np.concatenate(points)
+        return np.array([points.min(axis=0), points.max(axis=0)])
@@ -0,0 +1,231 @@
+import argparse
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import time
+from itertools import islice
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+READ_BLOCK_SIZE = 1 << 20
+WRITE_CHUNK_LINES = 65536
+
+COMPRESSED_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+# Domyślne poziomy bibliotek (gzip 9, xz 6) są kilkukrotnie wolniejsze przy niewielkim zysku na tekście G-code.
+COMPRESSION_LEVELS = {'.gz': {'compresslevel': 6}, '.xz': {'preset': 0}}
+if zstd is not None:
+    COMPRESSED_OPENERS['.zst'] = zstd.open
+
+
+def compression_of(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.zst' and zstd is None:
+        raise ValueError("Pliki .zst wymagają modułu compression.zstd (Python 3.14 lub nowszy)")
+    return extension if extension in COMPRESSED_OPENERS else None
+
+
+def open_program(path, mode='rb'):
+    return _open(path, compression_of(path), mode)
+
+
+def _open(path, compression, mode):
+    if compression is None:
+        return open(path, mode)
+    options = COMPRESSION_LEVELS.get(compression, {}) if 'w' in mode else {}
+    return COMPRESSED_OPENERS[compression](path, mode, **options)
+
+
+def program_filetypes():
+    patterns = " ".join(f"*.gcode{extension}" for extension in COMPRESSED_OPENERS)
+    return [
+        ("G-code files", "*.gcode"), ("Skompresowany G-code", patterns),
+        ("Text files", "*.txt"), ("All files", "*.*")
+    ]
+
+
+def _block_ranges(mm, size, block_size):
+    start = 0
+    while start < size:
+        end = mm.rfind(b'\n', start, min(start + block_size, size))
+        if end == -1:
+            end = mm.find(b'\n', start + block_size) if start + block_size < size else -1
+            if end == -1:
+                end = size
+        yield start, end
+        start = end + 1
+
+
+def _stream_blocks(f, block_size):
+    # Strumień z dekompresji nie pozwala na mmap, więc bloki są cięte na ostatnim końcu linii.
+    rest = b""
+    while True:
+        data = f.read(block_size)
+        if not data:
+            break
+        data = rest + data
+        end = data.rfind(b'\n')
+        if end == -1:
+            rest = data
+            continue
+        yield data[:end]
+        rest = data[end + 1:]
+    if rest:
+        yield rest
+
+
+def iter_block_ranges(path, block_size=READ_BLOCK_SIZE):
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _block_ranges(mm, size, block_size)
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def iter_blocks(path, block_size=READ_BLOCK_SIZE, encoding='utf-8'):
+    if compression_of(path) is not None:
+        with open_program(path) as f:
+            for block in _stream_blocks(f, block_size):
+                yield block.decode(encoding) if encoding else block
+        return
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in _block_ranges(mm, size, block_size):
+                block = mm[start:end]
+                yield block.decode(encoding) if encoding else block
+
+
+def iter_lines(path, block_size=READ_BLOCK_SIZE, encoding='utf-8'):
+    for block in iter_blocks(path, block_size, encoding):
+        for line in block.split('\n'):
+            yield line.strip()
+
+
+class ProgramFile:
+    def __init__(self, path):
+        self.path = path
+        self.appended = []
+        os.stat(path)
+        compression_of(path)
+
+    def __iter__(self):
+        yield from iter_lines(self.path)
+        yield from self.appended
+
+    def iter_blocks(self):
+        yield from iter_blocks(self.path, encoding=None)
+        if self.appended:
+            yield "\n".join(self.appended).encode('utf-8')
+
+    def __bool__(self):
+        return bool(self.appended) or os.path.getsize(self.path) > 0
+
+    def append(self, line):
+        self.appended.append(line)
+
+    def extend(self, lines):
+        self.appended.extend(lines)
+
+    def rebase(self, path):
+        # Po zapisie dopisane linie są już w pliku, więc nie mogą być dokładane drugi raz.
+        self.path = path
+        self.appended = []
+
+
+def _program_bytes(program, chunk_lines):
+    if isinstance(program, str):
+        yield program.encode('utf-8')
+        return
+    if hasattr(program, 'iter_blocks'):
+        for block in program.iter_blocks():
+            yield block + b"\n"
+        return
+    lines = iter(program)
+    while True:
+        chunk = list(islice(lines, chunk_lines))
+        if not chunk:
+            return
+        yield ("\n".join(str(line) for line in chunk) + "\n").encode('utf-8')
+
+
+def write_program(path, program, chunk_lines=WRITE_CHUNK_LINES):
+    started = time.perf_counter()
+    written = 0
+    # Zapis do pliku tymczasowego: program wczytany z pliku może być zapisywany w to samo miejsce.
+    temporary = f"{path}.tmp{os.getpid()}"
+    compression = compression_of(path)
+    try:
+        with _open(temporary, compression, 'wb') as f:
+            for block in _program_bytes(program, chunk_lines):
+                f.write(block)
+                written += len(block)
+        os.replace(temporary, path)
+        if isinstance(program, ProgramFile) and os.path.abspath(program.path) == os.path.abspath(path):
+            program.rebase(path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return {
+        'bytes': written,
+        'file_bytes': os.path.getsize(path),
+        'compressed': compression_of(path) is not None,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def read_program(path, block_size=READ_BLOCK_SIZE):
+    started = time.perf_counter()
+    size = 0
+    lines = 0
+    for block in iter_blocks(path, block_size, encoding=None):
+        size += len(block) + 1
+        lines += block.count(b'\n') + 1
+    return {
+        'bytes': size,
+        'file_bytes': os.path.getsize(path),
+        'compressed': compression_of(path) is not None,
+        'lines': lines,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def throughput_text(stats):
+    megabytes = stats['bytes'] / 2**20
+    text = f"{megabytes:.1f} MB w {stats['seconds']:.2f} s ({megabytes / max(stats['seconds'], 1e-9):.1f} MB/s)"
+    if stats['compressed']:
+        text += f", plik {stats['file_bytes'] / 2**20:.1f} MB"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archiwizacja i odczyt programów G-code z kompresją")
+    parser.add_argument('source', help="plik źródłowy (.gcode, .gcode.gz, .gcode.bz2, .gcode.xz, .gcode.zst)")
+    parser.add_argument('target', nargs='?', help="plik docelowy; bez niego mierzony jest tylko odczyt")
+    parser.add_argument('--block-size', type=int, default=READ_BLOCK_SIZE, help="rozmiar bloku odczytu w bajtach")
+    args = parser.parse_args(argv)
+
+    if args.target is None:
+        stats = read_program(args.source, args.block_size)
+        print(f"Odczytano {stats['lines']} linii: {throughput_text(stats)}")
+    else:
+        stats = write_program(args.target, ProgramFile(args.source))
+        print(f"Zapisano {args.target}: {throughput_text(stats)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+import numpy as np
+from function_occ import GCodeParser, ModalState
+from io_occ import iter_block_ranges, iter_blocks, read_range, compression_of
+
+PARALLEL_CHUNK_BYTES = 4 << 20
+PARALLEL_CHUNK_LINES = 200000
+PARALLEL_MIN_CHUNKS = 2
+PARALLEL_CHUNKS_PER_WORKER = 2
+
+
+def _tokenize_chunk(chunk):
+    if isinstance(chunk, tuple):
+        chunk = read_range(*chunk)
+    line_count = chunk.count(b'\n') + 1
+    return GCodeParser.tokenize(chunk), line_count
+
+
+def _slice_words(words, start_line, end_line):
+    rows = np.searchsorted(words['line'], (start_line, end_line))
+    return {key: values[rows[0]:rows[1]] for key, values in words.items()}
+
+
+class ParallelParser:
+    def __init__(self, workers=None, chunk_bytes=PARALLEL_CHUNK_BYTES, chunk_lines=PARALLEL_CHUNK_LINES):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self.chunk_lines = chunk_lines
+        self._executor = None
+
+    def _chunks(self, program):
+        if hasattr(program, 'path'):
+            if compression_of(program.path) is not None:
+                # Skompresowanego pliku nie da się czytać od środka, więc procesy dostają gotowe bloki.
+                yield from iter_blocks(program.path, self.chunk_bytes, encoding=None)
+            else:
+                for start, end in iter_block_ranges(program.path, self.chunk_bytes):
+                    yield (program.path, start, end)
+            program = getattr(program, 'appended', ())
+        lines = iter(program)
+        while True:
+            chunk = list(islice(lines, self.chunk_lines))
+            if not chunk:
+                return
+            yield "\n".join(chunk).encode('utf-8')
+
+    def _map(self, chunks):
+        chunks = iter(chunks)
+        head = list(islice(chunks, PARALLEL_MIN_CHUNKS))
+        if self.workers == 1 or len(head) < PARALLEL_MIN_CHUNKS:
+            yield from map(_tokenize_chunk, chain(head, chunks))
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+
+        # Fragmenty są wysyłane w miarę czytania, a w pamięci czeka ich najwyżej kilka na proces,
+        # więc nawet skompresowany program nie jest rozpakowywany w całości.
+        pending = deque()
+        for chunk in chain(head, chunks):
+            pending.append(self._executor.submit(_tokenize_chunk, chunk))
+            if len(pending) >= self.workers * PARALLEL_CHUNKS_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def iter_blocks(self, program, state=None, block_lines=None):
+        if state is None:
+            state = ModalState()
+
+        # Tokenizacja nie zależy od stanu modalnego, więc fragmenty są dzielone między procesy,
+        # a stan (pozycja, posuw, jednostki) jest przenoszony między nimi tutaj, po kolei.
+        for words, line_count in self._map(self._chunks(program)):
+            step = block_lines or line_count
+            for start in range(0, line_count, step):
+                block_state = state.copy()
+                end = min(start + step, line_count)
+                block_words = _slice_words(words, start, end)
+                block_words['line'] = block_words['line'] + state.line - start
+                state.line += end - start
+                yield block_state, end - start, GCodeParser._resolve_words(block_words, state)
+
+    def parse_program(self, program, state=None):
+        moves = [block_moves for _, _, block_moves in self.iter_blocks(program, state)]
+        if not moves:
+            return GCodeParser.parse_program([], state)
+        return np.concatenate(moves)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
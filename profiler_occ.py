@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from functools import wraps
+
+PROFILE_TRACE = "profil_animacji.json"
+MAX_HOT_SPOTS = 20
+MAX_TRACE_EVENTS = 200000
+
+
+class Profiler:
+    def __init__(self, max_events=MAX_TRACE_EVENTS):
+        self.started = time.perf_counter()
+        self.line = None
+        # Ślad ma ograniczoną długość; sumy czasów liczone są dalej dla wszystkich wywołań.
+        self.max_events = max_events
+        self.dropped = 0
+        self.events = []
+        self.counters = []
+        self._lock = threading.Lock()
+        self.totals = {}
+        self.by_line = {}
+        self._local = threading.local()
+        self._patched = []
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def instrument(self, target, name, phase=None, after=None, line_of=None):
+        # Pomiar jest wpinany w miejsce metody tylko przy włączonym profilowaniu,
+        # więc bez profilera kod nie wykonuje żadnych dodatkowych instrukcji.
+        phase = phase or name
+        original = getattr(target, name)
+        had_own = name in getattr(target, '__dict__', {})
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            if line_of is not None:
+                line = line_of(*args, **kwargs)
+                with self._lock:
+                    self.line = line
+            stack = self._stack()
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += duration
+                self._record(phase, start, duration, duration - children)
+                if after is not None:
+                    after()
+
+        setattr(target, name, timed)
+        self._patched.append((target, name, original, had_own))
+
+    def _record(self, phase, start, duration, own):
+        # Animacja i symulacja zapisują pomiary z różnych wątków.
+        with self._lock:
+            line = self.line
+            if len(self.events) < self.max_events:
+                self.events.append((phase, threading.get_ident(), start - self.started, duration, line))
+            else:
+                self.dropped += 1
+            for table, key in ((self.totals, phase), (self.by_line, (line, phase))):
+                entry = table.setdefault(key, [0, 0.0])
+                entry[0] += 1
+                entry[1] += own
+
+    def count(self, name, value):
+        with self._lock:
+            if len(self.counters) < self.max_events:
+                self.counters.append((name, time.perf_counter() - self.started, value))
+            else:
+                self.dropped += 1
+
+    def restore(self):
+        for target, name, original, had_own in reversed(self._patched):
+            if had_own:
+                setattr(target, name, original)
+            else:
+                delattr(target, name)
+        self._patched = []
+
+    def chrome_trace(self):
+        events = [
+            {
+                'name': phase, 'ph': 'X', 'pid': 0, 'tid': thread,
+                'ts': start * 1e6, 'dur': duration * 1e6,
+                'args': {'line': None if line is None else line + 1}
+            }
+            for phase, thread, start, duration, line in self.events
+        ]
+        events += [
+            {'name': name, 'ph': 'C', 'pid': 0, 'ts': moment * 1e6, 'args': {name: value}}
+            for name, moment, value in self.counters
+        ]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path=PROFILE_TRACE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def hot_spots(self, limit=MAX_HOT_SPOTS):
+        rows = [
+            (line, phase, calls, seconds)
+            for (line, phase), (calls, seconds) in self.by_line.items()
+        ]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:limit]
+
+    def report(self, limit=MAX_HOT_SPOTS):
+        lines = [f"{'Faza':<14}{'Wywołania':>10}{'Czas [s]':>12}"]
+        for phase, (calls, seconds) in sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"{phase:<14}{calls:>10}{seconds:>12.3f}")
+        lines.append("")
+        lines.append(f"{'Linia':>8}  {'Faza':<14}{'Wywołania':>10}{'Czas [s]':>12}")
+        for line, phase, calls, seconds in self.hot_spots(limit):
+            label = "-" if line is None else line + 1
+            lines.append(f"{label:>8}  {phase:<14}{calls:>10}{seconds:>12.3f}")
+        if self.dropped:
+            lines.append("")
+            lines.append(f"Pominięto w śladzie {self.dropped} zdarzeń (limit {self.max_events})")
+        return "\n".join(lines)
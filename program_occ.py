@@ -0,0 +1,109 @@
+from itertools import islice
+import numpy as np
+from function_occ import GCodeParser, ModalState, MOVE_DTYPE
+
+PROGRAM_BLOCK_LINES = 4096
+
+
+class ProgramBlock:
+    def __init__(self, start, line_count, state, moves):
+        self.start = start
+        self.line_count = line_count
+        self.state = state
+        self.moves = moves
+
+    def shift(self, delta):
+        self.start += delta
+        self.state.line += delta
+        self.moves['line'] += delta
+
+
+class ProgramModel:
+    def __init__(self, block_lines=PROGRAM_BLOCK_LINES, parser=None):
+        self.block_lines = block_lines
+        self.parser = parser
+        self.line_hashes = np.zeros(0, dtype=np.int64)
+        self.blocks = []
+        self.final_state = ModalState()
+        self._moves = None
+
+    def update(self, program):
+        hashes = np.fromiter((hash(line) for line in program), dtype=np.int64)
+        old = self.line_hashes
+        common = min(len(old), len(hashes))
+
+        changed = np.flatnonzero(old[:common] != hashes[:common])
+        first = int(changed[0]) if len(changed) else common
+        if first == len(old) == len(hashes):
+            return None
+
+        tail = common - first
+        changed = np.flatnonzero(old[::-1][:tail] != hashes[::-1][:tail])
+        suffix = int(changed[0]) if len(changed) else tail
+        delta = len(hashes) - len(old)
+        unchanged_from = len(hashes) - suffix
+
+        k = 0
+        while k + 1 < len(self.blocks) and self.blocks[k + 1].start <= first:
+            k += 1
+        old_blocks = self.blocks
+        # Początki starych bloków za zmienionym fragmentem, w numeracji linii nowego programu.
+        boundaries = [(block.start + delta, i) for i, block in enumerate(old_blocks)
+                      if i >= k and block.start + delta >= unchanged_from]
+        b = 0
+        if old_blocks:
+            position = old_blocks[k].start
+            state = old_blocks[k].state.copy()
+        else:
+            position = 0
+            state = ModalState()
+
+        blocks = old_blocks[:k]
+        if not old_blocks and self.parser is not None:
+            for block_state, line_count, moves in self.parser.iter_blocks(program, state, self.block_lines):
+                blocks.append(ProgramBlock(position, line_count, block_state, moves))
+                position += line_count
+        else:
+            lines = islice(iter(program), position, None)
+            while True:
+                while b < len(boundaries) and boundaries[b][0] < position:
+                    b += 1
+                # Od tego miejsca tekst się nie zmienił - jeśli stan modalny też się zgadza,
+                # pozostałe bloki można przesunąć zamiast parsować ponownie.
+                if b < len(boundaries) and boundaries[b][0] == position:
+                    reused = boundaries[b][1]
+                    if old_blocks[reused].state == state:
+                        for block in old_blocks[reused:]:
+                            block.shift(delta)
+                            blocks.append(block)
+                        state = self.final_state
+                        state.line += delta
+                        break
+                    b += 1
+
+                # Blok kończy się na najbliższej starej granicy, więc wstawienie lub usunięcie
+                # dowolnej liczby linii nie przesuwa podziału dla reszty programu.
+                size = self.block_lines
+                if b < len(boundaries):
+                    size = min(size, boundaries[b][0] - position)
+                chunk = list(islice(lines, size))
+                if not chunk:
+                    break
+                block_state = state.copy()
+                moves = GCodeParser.parse_program(chunk, state)
+                blocks.append(ProgramBlock(position, len(chunk), block_state, moves))
+                position += len(chunk)
+
+        self.blocks = blocks
+        self.final_state = state
+        self.line_hashes = hashes
+        self._moves = None
+        return first
+
+    def moves(self):
+        if self._moves is None:
+            if self.blocks:
+                self._moves = np.concatenate([block.moves for block in self.blocks])
+            else:
+                self._moves = np.zeros(0, dtype=MOVE_DTYPE)
+        return self._moves
@@ -0,0 +1,98 @@
+import time
+import numpy as np
+from function_occ import (
+    GCodeParser, ModalState, ARC_TOLERANCE,
+    MOVE_G00, MOVE_G01, MOVE_ARC, MOVE_TOOL_CHANGE
+)
+from estimator_occ import TimeEstimator
+from stock_occ import make_stock, DEFAULT_ENGINE
+
+START_POSITION = (0.0, 0.0, 5.0)
+TOOL_RADIUS = 2.0
+TOOL_LENGTH = 10.0
+
+LOG_DTYPE = np.dtype([
+    ('line', np.int64),
+    ('type', np.int8),
+    ('x', np.float64),
+    ('y', np.float64),
+    ('z', np.float64),
+    ('removed', np.bool_),
+    ('seconds', np.float64)
+])
+
+
+class MachiningSimulation:
+    def __init__(self, width, length, height, engine=DEFAULT_ENGINE, arc_tolerance=ARC_TOLERANCE,
+                 tool_radius=TOOL_RADIUS, tool_length=TOOL_LENGTH, start_position=START_POSITION,
+                 **options):
+        self.stock = make_stock(engine, length, width, height, arc_tolerance, **options)
+        self.engine = engine
+        self.arc_tolerance = arc_tolerance
+        self.tool_radius = tool_radius
+        self.tool_length = tool_length
+        self.start_position = tuple(float(v) for v in start_position)
+        self.position = self.start_position
+
+    def step(self, move):
+        move_type = int(move['type'])
+        end = (float(move['x']), float(move['y']), float(move['z']))
+        removed = False
+
+        if move_type == MOVE_G01:
+            removed = self.stock.cut_line(self.position, end, self.tool_radius, self.tool_length)
+        elif move_type == MOVE_ARC:
+            removed = self.stock.cut_arc(
+                (float(move['cx']), float(move['cy'])), float(move['radius']),
+                float(move['start_angle']), float(move['end_angle']),
+                self.position[2], end[2], self.tool_radius, self.tool_length
+            )
+        elif move_type == MOVE_TOOL_CHANGE:
+            removed = self.stock.flush()
+            self.tool_radius = float(move['radius'])
+
+        self.position = end
+        return removed
+
+    def run(self, commands):
+        if isinstance(commands, np.ndarray):
+            moves = commands
+        else:
+            moves = GCodeParser.parse_program(commands, ModalState(self.start_position))
+        start_position = self.position
+        tool_radius = self.tool_radius
+
+        log = np.zeros(len(moves), dtype=LOG_DTYPE)
+        for name in ('line', 'type', 'x', 'y', 'z'):
+            log[name] = moves[name]
+
+        started = time.perf_counter()
+        for i, move in enumerate(moves):
+            step_start = time.perf_counter()
+            log['removed'][i] = self.step(move)
+            log['seconds'][i] = time.perf_counter() - step_start
+        self.stock.flush()
+        wall_time = time.perf_counter() - started
+
+        machining_time = TimeEstimator.estimate(
+            moves, start_position, tool_radius=tool_radius, tolerance=self.arc_tolerance
+        )['total']
+        cutting = (moves['type'] == MOVE_G01) | (moves['type'] == MOVE_ARC)
+        return {
+            'stock': self.stock,
+            'log': log,
+            'stats': {
+                'engine': self.engine,
+                'moves': len(moves),
+                'cutting_moves': int(np.count_nonzero(cutting)),
+                'rapid_moves': int(np.count_nonzero(moves['type'] == MOVE_G00)),
+                'removing_moves': int(np.count_nonzero(log['removed'])),
+                'wall_time': wall_time,
+                'machining_time': machining_time,
+                'speedup': machining_time / wall_time if wall_time > 0 else float('inf')
+            }
+        }
+
+
+def simulate(commands, width, length, height, engine=DEFAULT_ENGINE, arc_tolerance=ARC_TOLERANCE, **options):
+    return MachiningSimulation(width, length, height, engine, arc_tolerance, **options).run(commands)
@@ -0,0 +1,94 @@
+import importlib
+import math
+import zlib
+import numpy as np
+from zmap_occ import HeightField, ZMAP_RESOLUTION
+from function_occ import GCodeParser, ARC_TOLERANCE
+
+DEFAULT_ENGINE = 'zmap'
+MIN_LINEAR_STEPS = 10
+LINEAR_STEPS_PER_MM = 2
+
+
+def linear_steps(distance):
+    return max(MIN_LINEAR_STEPS, int(distance * LINEAR_STEPS_PER_MM))
+
+
+class Stock:
+    stepwise = True
+
+    def __init__(self, arc_tolerance=ARC_TOLERANCE):
+        self.arc_tolerance = arc_tolerance
+
+    def cut_line(self, start, end, radius, length):
+        # Te same kroki co w animacji, żeby wynik nie zależał od trybu uruchomienia.
+        steps = linear_steps(math.dist(start, end))
+        t = np.linspace(0.0, 1.0, steps + 1)[:, None]
+        points = (np.asarray(start) + (np.asarray(end) - np.asarray(start)) * t).tolist()
+        changed = False
+        for step_start, step_end in zip(points[:1] + points[:-1], points):
+            changed |= self.cut(step_start, step_end, radius, length)
+        return changed
+
+    def cut_arc(self, center, arc_radius, start_angle, end_angle, start_z, end_z, radius, length):
+        points = GCodeParser.arc_points(
+            center, arc_radius, start_angle, end_angle, start_z, end_z, radius, self.arc_tolerance
+        ).tolist()
+        changed = False
+        for start, end in zip(points[:-1], points[1:]):
+            changed |= self.cut(start, end, radius, length)
+        return changed
+
+    def flush(self):
+        return False
+
+
+class ZMapStock(Stock):
+    def __init__(self, length, width, height, arc_tolerance=ARC_TOLERANCE, resolution=ZMAP_RESOLUTION):
+        super().__init__(arc_tolerance)
+        self.field = HeightField(length, width, height, resolution)
+        self._mesh = None
+
+    def cut(self, start, end, radius, length):
+        return self.field.cut(start, end, radius)
+
+    def cut_line(self, start, end, radius, length):
+        return self.field.cut(start, end, radius)
+
+    def shape(self):
+        if self._mesh is None:
+            from brep_occ import GridMesh
+            self._mesh = GridMesh.shared(self.field)
+        # Kopia, bo wątek symulacji może w tym czasie obniżać kolejne komórki.
+        return self._mesh.update(self.field.z.copy())
+
+    def volume(self):
+        return self.field.volume()
+
+    def snapshot(self):
+        # Siatka wysokości jest w większości płaska, więc dobrze się kompresuje.
+        return zlib.compress(self.field.z.tobytes(), 1)
+
+    def restore(self, data):
+        self.field.z = np.frombuffer(zlib.decompress(data)).reshape(self.field.z.shape).copy()
+
+
+# Silniki B-rep wymagają pythonOCC, więc brep_occ jest importowany dopiero przy ich wyborze;
+# Z-map działa na samym NumPy, także bez OCC.
+STOCK_ENGINES = {
+    'brep': ('brep_occ', 'BRepStock'),
+    'batch': ('brep_occ', 'BatchedStock'),
+    'swept': ('brep_occ', 'SweptStock'),
+    'zmap': ('stock_occ', 'ZMapStock')
+}
+
+
+def stock_class(engine):
+    if engine not in STOCK_ENGINES:
+        raise ValueError(f"Nieznany silnik usuwania materiału: {engine}")
+    module, name = STOCK_ENGINES[engine]
+    return getattr(importlib.import_module(module), name)
+
+
+def make_stock(engine, length, width, height, arc_tolerance=ARC_TOLERANCE, **options):
+    return stock_class(engine)(length, width, height, arc_tolerance, **options)
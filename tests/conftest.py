@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+    from app_occ import App
+    # Generatory z App nie korzystają z okna, więc wystarcza obiekt bez wywołania __init__.
+    return App.__new__(App)
+
+
+@pytest.fixture
+def program(app):
+    lines = [app.change_tool(1, 2)]
+    lines += app.rectangular_pocket_mill(2, 2, 16, 12, 3, 1, 2000, 2)
+    lines += app.circular_pocket_mill(30, 10, 12, 3, 1, 1500, 2)
+    lines += app.drill_material(45, 5, 5, 300)
+    lines += ["G00 X40 Y15 Z5", "G01 Z-1 F800"]
+    lines += app.arc_mill_clockwise(50, 15, 5, 0, 5)
+    lines += ["G00 X50 Y15 Z-1"]
+    lines += app.arc_mill_counterclockwise(40, 15, 0, 0, 5)
+    lines.append("G00 Z5")
+    return lines
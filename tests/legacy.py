@@ -0,0 +1,226 @@
+import math
+
+
+# Parser linia po linii z pierwszej wersji programu, zachowany jako wzorzec dla parse_program.
+def parse(command, current_position, current_feedrate):
+    cmd_parts = command.strip().upper().split()
+    if not cmd_parts:
+        return {'type': 'UNKNOWN'}
+
+    if cmd_parts[0].startswith('F'):
+        try:
+            return {'type': 'UPDATE_FEED', 'f': float(cmd_parts[0][1:])}
+        except ValueError:
+            return {'type': 'UNKNOWN'}
+
+    gcode = cmd_parts[0]
+    components = {}
+    for part in cmd_parts[1:]:
+        try:
+            components[part[0]] = float(part[1:])
+        except ValueError:
+            continue
+
+    new_feedrate = components.get('F', current_feedrate)
+    target = {
+        'x': components.get('X', current_position[0]),
+        'y': components.get('Y', current_position[1]),
+        'z': components.get('Z', current_position[2])
+    }
+    if gcode in ('G00', 'G0'):
+        return dict(target, type='G00', f=5000)
+    if gcode in ('G01', 'G1'):
+        return dict(target, type='G01', f=new_feedrate)
+    if gcode in ('G02', 'G2', 'G03', 'G3'):
+        is_cw = gcode in ('G02', 'G2')
+        if 'R' in components:
+            parsed = _parse_r_notation(components, current_position, is_cw)
+        else:
+            parsed = _parse_ij_notation(components, current_position, is_cw)
+        parsed.update(target, type='ARC', f=new_feedrate)
+        return parsed
+    return {'type': 'UNKNOWN', 'f': current_feedrate}
+
+
+def _parse_r_notation(components, current_pos, is_cw):
+    radius = abs(components['R'])
+    x_target = components.get('X', current_pos[0])
+    y_target = components.get('Y', current_pos[1])
+    dx = x_target - current_pos[0]
+    dy = y_target - current_pos[1]
+    chord_length = math.hypot(dx, dy)
+    if chord_length > 2 * radius:
+        raise ValueError(f"Promień {radius} za mały dla cięciwy {chord_length}")
+
+    perp = [dy, -dx] if is_cw else [-dy, dx]
+    perp_length = math.hypot(*perp)
+    if perp_length > 1e-6:
+        perp = [p / perp_length for p in perp]
+    offset = math.sqrt(radius ** 2 - (chord_length / 2) ** 2)
+    center_x = current_pos[0] + dx / 2 + perp[0] * offset
+    center_y = current_pos[1] + dy / 2 + perp[1] * offset
+    return {
+        'center': [center_x, center_y, current_pos[2]],
+        'radius': radius,
+        'start_angle': math.atan2(current_pos[1] - center_y, current_pos[0] - center_x),
+        'end_angle': math.atan2(y_target - center_y, x_target - center_x),
+        'is_cw': is_cw
+    }
+
+
+def _parse_ij_notation(components, current_pos, is_cw):
+    x_target = components.get('X', current_pos[0])
+    y_target = components.get('Y', current_pos[1])
+    center_x = current_pos[0] + components.get('I', 0.0)
+    center_y = current_pos[1] + components.get('J', 0.0)
+    radius = math.hypot(center_x - current_pos[0], center_y - current_pos[1])
+    start_angle = math.atan2(current_pos[1] - center_y, current_pos[0] - center_x)
+    end_angle = math.atan2(y_target - center_y, x_target - center_x)
+    angular_dist = end_angle - start_angle
+    if is_cw and angular_dist > -1e-6:
+        angular_dist -= 2 * math.pi
+    elif not is_cw and angular_dist < 1e-6:
+        angular_dist += 2 * math.pi
+    return {
+        'center': [center_x, center_y, current_pos[2]],
+        'radius': radius,
+        'start_angle': start_angle,
+        'end_angle': start_angle + angular_dist,
+        'is_cw': is_cw
+    }
+
+
+def legacy_moves(lines, position=(0.0, 0.0, 5.0), feedrate=1000):
+    position = list(position)
+    moves = []
+    for line in lines:
+        parsed = parse(line, position, feedrate)
+        if parsed['type'] == 'UPDATE_FEED':
+            feedrate = parsed['f']
+        elif parsed['type'] in ('G00', 'G01', 'ARC'):
+            if parsed['type'] != 'G00':
+                feedrate = parsed['f']
+            moves.append(parsed)
+            position = [parsed['x'], parsed['y'], parsed['z']]
+    return moves
+
+
+# Generatory ścieżek z pierwszej wersji programu, zachowane jako wzorzec dla toolpath_occ.
+def circular_pocket_mill(x, y, diameter, depth, stepdown, feedrate, tool_radius):
+    commands = []
+    initial_x = x
+    commands.append(f"G0 X{round(x, 3)} Y{round(y, 3)} Z5")
+    if feedrate != '' or feedrate != 0:
+        commands.append(f"F{round(feedrate, 3)}")
+    commands.append("M3")
+    steps_number = depth / stepdown
+    steps_down = []
+    if steps_number % 1 != 0:
+        step_down = 0
+        last_step = depth - int(steps_number) * stepdown
+        for i in range(int(steps_number)):
+            step_down -= stepdown
+            steps_down.append(step_down)
+        steps_down.append(round(step_down - last_step, 3))
+    else:
+        step_down = 0
+        for i in range(int(steps_number)):
+            step_down -= stepdown
+            steps_down.append(step_down)
+    rotations_number = diameter / (tool_radius * 2)
+    rotations_x = []
+    if rotations_number % 1 != 0:
+        rotations_number = int(rotations_number)
+        last_rotation = x - diameter / 2 + tool_radius
+        for i in range(rotations_number):
+            rotations_x.append(x)
+            x -= tool_radius
+        if last_rotation != 0 and initial_x != 0:
+            rotations_x.append(last_rotation)
+            del rotations_x[0]
+    else:
+        for i in range(int(rotations_number)):
+            x -= tool_radius
+            rotations_x.append(x)
+    current_radius = tool_radius
+    for step_down in steps_down:
+        current_radius = tool_radius
+        commands.append(f"G01 X{initial_x} Y{y}")
+        commands.append(f"G01 Z{step_down}")
+        if initial_x != 24:
+            for rotation in rotations_x:
+                if rotation == initial_x:
+                    continue
+                commands.append(f"G01 X{rotation}")
+                if rotation != rotations_x[-1]:
+                    commands.append(f"G02 X{rotation} Y{y} I{current_radius} J0 F{feedrate}")
+                    current_radius += tool_radius
+                else:
+                    current_radius = initial_x - rotations_x[-1]
+                    commands.append(f"G02 X{rotation} Y{y} I{current_radius} J0 F{feedrate}")
+    commands.append("G0 Z5")
+    commands.append("M5")
+    return commands
+
+
+def rectangular_pocket_mill(x, y, width, height, depth, stepdown, feedrate, tool_radius):
+    commands = []
+    num_passes = int(depth / stepdown) + 1
+    commands.append(f"G0 X{round(x + tool_radius, 3)} Y{round(y + tool_radius, 3)} Z5")
+    if feedrate > 0:
+        commands.append(f"F{round(feedrate, 3)}")
+    commands.append("M3")
+    for pass_num in range(num_passes):
+        z_depth = round(pass_num * stepdown, 3)
+        if z_depth == 0.0:
+            continue
+        commands.append(f"G1 Z{-z_depth}")
+        current_x = round(x + tool_radius, 3)
+        current_y = round(y + tool_radius, 3)
+        current_width = round(width - 2 * tool_radius, 3)
+        current_height = round(height - 2 * tool_radius, 3)
+        while current_width > 0 and current_height > 0:
+            commands.append(f"G1 X{round(current_x, 3)} Y{round(current_y, 3)}")
+            commands.append(f"G1 X{round(current_x + current_width, 3)} Y{round(current_y, 3)}")
+            commands.append(f"G1 X{round(current_x + current_width, 3)} Y{round(current_y + current_height, 3)}")
+            commands.append(f"G1 X{round(current_x, 3)} Y{round(current_y + current_height, 3)}")
+            commands.append(f"G1 X{round(current_x, 3)} Y{round(current_y, 3)}")
+            current_x = round(current_x + tool_radius, 3)
+            current_y = round(current_y + tool_radius, 3)
+            current_width = round(current_width - 2 * tool_radius, 3)
+            current_height = round(current_height - 2 * tool_radius, 3)
+    if width > height:
+        fake_square_side = height / 2
+        commands.append(f"G01 X{x + fake_square_side} Y{y + height - fake_square_side}")
+    else:
+        fake_square_side = width / 2
+        commands.append(f"G01 X{x + fake_square_side} Y{y + fake_square_side}")
+        commands.append(f"G01 X{x + width - tool_radius} Y{y + tool_radius}")
+        commands.append(f"G01 X{x + fake_square_side} Y{y + fake_square_side}")
+        commands.append(f"G01 X{x + fake_square_side} Y{y + height - fake_square_side}")
+        commands.append(f"G01 X{x + tool_radius} Y{y + height - tool_radius}")
+        commands.append(f"G01 X{x + fake_square_side} Y{y + height - fake_square_side}")
+        commands.append(f"G01 X{x + width - tool_radius} Y{y + height - tool_radius}")
+    commands.append("M5")
+    return commands
+
+
+def bore_material(x=None, y=None, z=None, feedrate=None):
+    commands = []
+    position_command = "G00"
+    if x is not None:
+        position_command += f" X{round(x, 3)}"
+    if y is not None:
+        position_command += f" Y{round(y, 3)}"
+    position_command += " Z5"
+    commands.append(position_command)
+    if feedrate is not None:
+        commands.append(f"F{round(feedrate, 3)}")
+    commands.append(f"G01 Z{-round(z, 3)}")
+    commands.append("G00 Z5")
+    return commands
+
+
+def drill_material(x=None, y=None, z=None, feedrate=None):
+    commands = bore_material(x, y, z, feedrate)
+    return commands[:-2] + ["M03", "M08"] + commands[-2:] + ["M09"]
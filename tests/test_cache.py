@@ -0,0 +1,47 @@
+import os
+import numpy as np
+from cache_occ import ProgramCache
+
+
+def test_key_depends_on_program_and_tolerance(tmp_path, program):
+    cache = ProgramCache(str(tmp_path))
+    key = cache.key(program)
+    assert key == cache.key(list(program))
+    assert key != cache.key(program + ["G0 Z10"])
+    assert key != cache.key(program, tolerance=0.1)
+
+
+def test_key_of_file_matches_list(tmp_path, program):
+    from io_occ import ProgramFile
+    path = tmp_path / "p.gcode"
+    path.write_text("\n".join(program))
+    cache = ProgramCache(str(tmp_path / "cache"))
+    assert cache.key(ProgramFile(str(path))) == cache.key(program)
+
+
+def test_store_and_load(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    moves = np.arange(10.0)
+    cache.store("abc", moves=moves, time=12.5)
+    entry = cache.load("abc")
+    assert np.array_equal(entry['moves'], moves)
+    assert entry['time'] == 12.5
+    assert cache.load("missing") is None
+
+
+def test_corrupt_entry_is_removed(tmp_path, capsys):
+    cache = ProgramCache(str(tmp_path))
+    (tmp_path / "bad.npz").write_bytes(b"not a zip")
+    assert cache.load("bad") is None
+    assert not (tmp_path / "bad.npz").exists()
+
+
+def test_eviction_removes_oldest(tmp_path):
+    cache = ProgramCache(str(tmp_path), max_bytes=3000)
+    for i, name in enumerate(("a", "b", "c")):
+        cache.store(name, data=np.zeros(200))
+        os.utime(tmp_path / f"{name}.npz", (i, i))
+    cache.evict()
+    remaining = sorted(os.listdir(tmp_path))
+    assert "c.npz" in remaining
+    assert "a.npz" not in remaining
@@ -0,0 +1,41 @@
+import numpy as np
+from function_occ import GCodeParser, ModalState
+from collision_occ import find_collisions, move_boxes, MoveIndex
+
+
+def check(lines, **options):
+    moves = GCodeParser.parse_program(lines, ModalState((0.0, 0.0, 5.0)))
+    return find_collisions(moves, 100, 100, 20, (0.0, 0.0, 5.0), **options)
+
+
+def test_rapid_through_material_is_flagged():
+    issues = check(["G0 X10 Y10", "G1 Z-2 F300", "G1 X30", "G0 X60 Y10"])
+    assert [(issue['line'], issue['kind']) for issue in issues] == [(3, 'rapid')]
+    assert issues[0]['depth'] > 1.9
+
+
+def test_rapid_in_cut_slot_is_allowed():
+    assert check(["G0 X10 Y10", "G1 Z-2 F300", "G1 X30", "G1 Z5", "G0 X10", "G0 Z-1", "G0 X30"]) == []
+
+
+def test_rapid_plunge_into_material():
+    issues = check(["G0 X50 Y50", "G0 Z-3"])
+    assert [(issue['line'], issue['kind']) for issue in issues] == [(1, 'plunge')]
+
+
+def test_shank_too_short():
+    issues = check(["G0 X10 Y10", "G1 Z-15 F100"], tool_length=10.0)
+    assert [(issue['kind'], round(issue['depth'], 3)) for issue in issues] == [('shank', 5.0)]
+
+
+def test_index_matches_brute_force():
+    rng = np.random.default_rng(3)
+    lines = [f"G1 X{x:.2f} Y{y:.2f} F100" for x, y in rng.uniform(0, 100, (200, 2))]
+    moves = GCodeParser.parse_program(lines, ModalState())
+    start = GCodeParser.start_points(moves)
+    low, high = move_boxes(moves, start, np.full(len(moves), 2.0))
+    index = MoveIndex(low, high, np.arange(len(moves)))
+    for box_low, box_high in rng.uniform(0, 100, (20, 2, 2)):
+        box_low, box_high = np.minimum(box_low, box_high), np.maximum(box_low, box_high)
+        expected = np.flatnonzero(np.all((low <= box_high) & (high >= box_low), axis=1))
+        assert sorted(index.query(box_low, box_high)) == list(expected)
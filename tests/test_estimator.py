@@ -0,0 +1,39 @@
+import pytest
+from function_occ import GCodeParser, ModalState
+from estimator_occ import TimeEstimator, MachineLimits
+
+
+def parse(lines):
+    return GCodeParser.parse_program(lines, ModalState((0.0, 0.0, 0.0)))
+
+
+def test_feed_time_of_straight_cut():
+    moves = parse(["G1 X100 F600"])
+    assert TimeEstimator.feed_time(moves, (0.0, 0.0, 0.0)) == pytest.approx(10.0)
+
+
+def test_long_cut_approaches_feed_time():
+    moves = parse(["G1 X1000 F600"])
+    estimate = TimeEstimator.estimate(moves, (0.0, 0.0, 0.0))
+    assert estimate['total'] > 100.0
+    assert estimate['total'] == pytest.approx(100.0, rel=0.01)
+
+
+def test_acceleration_makes_short_moves_slower():
+    moves = parse(["G1 X1 F6000", "G1 Y1", "G1 X0", "G1 Y0"])
+    estimate = TimeEstimator.estimate(moves, (0.0, 0.0, 0.0), MachineLimits(acceleration=(50, 50, 50)))
+    assert estimate['total'] > TimeEstimator.feed_time(moves, (0.0, 0.0, 0.0))
+
+
+def test_summary_by_type_and_operations(program):
+    moves = GCodeParser.parse_program(program, ModalState())
+    estimate = TimeEstimator.estimate(moves)
+    assert sum(estimate['by_type'].values()) == pytest.approx(estimate['total'])
+    assert sum(op['time'] for op in estimate['operations']) == pytest.approx(estimate['total'])
+    assert len(estimate['move_times']) == len(moves)
+    assert estimate['by_type']['ARC'] > 0
+
+
+def test_empty_program():
+    estimate = TimeEstimator.estimate(parse([]))
+    assert estimate['total'] == 0.0
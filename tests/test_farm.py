@@ -0,0 +1,52 @@
+import csv
+import json
+import pytest
+from function_occ import GCodeParser, ModalState
+from estimator_occ import TimeEstimator
+from io_occ import write_program
+from simulation_occ import START_POSITION
+from farm_occ import find_programs, run_farm, main
+
+STOCK = (60, 60, 10)
+
+
+@pytest.fixture
+def programs(tmp_path, program):
+    write_program(str(tmp_path / "a.gcode"), program)
+    write_program(str(tmp_path / "b.gcode.gz"), program[:40])
+    (tmp_path / "notes.md").write_text("G01 X1")
+    return tmp_path
+
+
+def test_find_programs(programs):
+    found = find_programs(str(programs))
+    assert [path.split("/")[-1] for path in found] == ["a.gcode", "b.gcode.gz"]
+    assert find_programs(str(programs / "*.gz")) == found[1:]
+
+
+def test_run_farm_matches_single_program(programs, program):
+    paths = find_programs(str(programs)) + [str(programs / "missing.gcode")]
+    rows = run_farm(paths, *STOCK, workers=2)
+    assert [row['file'] for row in rows] == sorted(paths)
+
+    first = rows[0]
+    moves = GCodeParser.parse_program(program, ModalState(START_POSITION))
+    assert first['error'] is None
+    assert first['lines'] == len(program)
+    assert first['moves'] == len(moves)
+    assert first['cycle_time'] == pytest.approx(TimeEstimator.estimate(moves, START_POSITION)['total'])
+    assert first['removed_volume'] > 0
+    assert first['stock_volume'] + first['removed_volume'] == pytest.approx(60 * 60 * 10)
+    assert rows[1]['moves'] < first['moves']
+    assert rows[2]['error']
+
+
+@pytest.mark.parametrize("output", ["summary.json", "summary.csv"])
+def test_main_writes_summary(programs, output, capsys):
+    path = str(programs / output)
+    assert main([str(programs), '--width', '60', '--length', '60', '--height', '10',
+                 '--workers', '1', '--output', path]) == 0
+    with open(path, encoding='utf-8') as f:
+        rows = json.load(f) if output.endswith('.json') else list(csv.DictReader(f))
+    assert len(rows) == 2
+    assert all(not row['error'] for row in rows)
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from function_occ import GCodeParser, ModalState
+from io_occ import ProgramFile, write_program, read_program, iter_blocks, COMPRESSED_OPENERS
+from parallel_occ import ParallelParser
+
+EXTENSIONS = ['.gcode'] + [f'.gcode{extension}' for extension in COMPRESSED_OPENERS]
+
+
+@pytest.mark.parametrize('extension', EXTENSIONS)
+def test_round_trip(tmp_path, program, extension):
+    path = str(tmp_path / f"p{extension}")
+    stats = write_program(path, program, chunk_lines=5)
+    assert stats['bytes'] == len("\n".join(program)) + 1
+    assert list(ProgramFile(path)) == program
+    assert read_program(path)['lines'] == len(program)
+
+
+@pytest.mark.parametrize('extension', EXTENSIONS)
+def test_compressed_program_parses_like_plain(tmp_path, program, extension):
+    path = str(tmp_path / f"p{extension}")
+    write_program(path, program)
+    expected = GCodeParser.parse_program(program, ModalState())
+    streamed = np.concatenate(list(GCodeParser.iter_program(ProgramFile(path), ModalState())))
+    parser = ParallelParser(workers=1, chunk_bytes=64)
+    assert np.array_equal(streamed, expected)
+    assert np.array_equal(parser.parse_program(ProgramFile(path), ModalState()), expected)
+
+
+@pytest.mark.parametrize('extension', ['.gcode', '.gcode.gz'])
+def test_parallel_parse_matches_serial(tmp_path, program, extension):
+    path = str(tmp_path / f"p{extension}")
+    write_program(path, program * 5)
+    expected = GCodeParser.parse_program(program * 5, ModalState())
+    parser = ParallelParser(workers=2, chunk_bytes=256)
+    try:
+        assert np.array_equal(parser.parse_program(ProgramFile(path), ModalState()), expected)
+    finally:
+        parser.shutdown()
+
+
+def test_parallel_chunks_are_submitted_as_they_are_read():
+    produced = []
+
+    def chunks():
+        for i in range(50):
+            produced.append(i)
+            yield f"G1 X{i}".encode()
+
+    parser = ParallelParser(workers=2)
+    try:
+        results = parser._map(chunks())
+        next(results)
+        assert len(produced) <= 2 * 2 + 1
+        assert len(list(results)) == 49
+    finally:
+        parser.shutdown()
+
+
+@pytest.mark.parametrize('extension', ['.gcode', '.gcode.gz'])
+def test_empty_lines_between_blocks_keep_line_numbers(tmp_path, extension):
+    program = ["G1 X1 F100", "", "", "G1 X2", "", "G1 X3", "", "", "", "G1 X4"]
+    path = str(tmp_path / f"p{extension}")
+    write_program(path, program)
+    state = ModalState()
+    blocks = list(iter_blocks(path, block_size=1, encoding=None))
+    assert b"" in blocks
+    moves = np.concatenate([GCodeParser.parse_program(block, state) for block in blocks])
+    assert list(moves['line']) == [0, 3, 5, 9]
+    assert state.line == len(program)
+
+
+def test_blocks_are_cut_at_line_ends(tmp_path, program):
+    path = str(tmp_path / "p.gcode.gz")
+    write_program(path, program)
+    blocks = list(iter_blocks(path, block_size=50, encoding=None))
+    assert len(blocks) > 1
+    assert b"\n".join(blocks).decode().split("\n") == program
+
+
+def test_zstd_without_codec(tmp_path):
+    if '.zst' in COMPRESSED_OPENERS:
+        pytest.skip("compression.zstd jest dostępny")
+    path = tmp_path / "p.gcode.zst"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        ProgramFile(str(path))
+
+
+@pytest.mark.parametrize('extension', EXTENSIONS)
+def test_saving_over_source_does_not_duplicate_appended_lines(tmp_path, extension):
+    path = str(tmp_path / f"p{extension}")
+    write_program(path, ["G0 X1", "G1 X2"])
+    program = ProgramFile(path)
+    program.append("G1 X3")
+    write_program(path, program)
+    assert list(program) == ["G0 X1", "G1 X2", "G1 X3"]
+    write_program(path, program)
+    assert list(ProgramFile(path)) == ["G0 X1", "G1 X2", "G1 X3"]
+
+
+def test_saving_elsewhere_keeps_source(tmp_path):
+    source = str(tmp_path / "a.gcode")
+    write_program(source, ["G0 X1"])
+    program = ProgramFile(source)
+    program.append("G1 X3")
+    write_program(str(tmp_path / "b.gcode.gz"), program)
+    assert list(program) == ["G0 X1", "G1 X3"]
+    assert list(ProgramFile(source)) == ["G0 X1"]
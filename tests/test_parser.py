@@ -0,0 +1,115 @@
+import math
+import numpy as np
+import pytest
+from function_occ import (
+    GCodeParser, ModalState, MOVE_G00, MOVE_G01, MOVE_ARC, MOVE_TOOL_CHANGE, MOVE_SPINDLE_START,
+    MOVE_SPINDLE_STOP, INCH
+)
+from legacy import legacy_moves
+
+
+def motion(moves):
+    return moves[moves['type'] <= MOVE_ARC]
+
+
+def test_parse_program_matches_legacy_parser(program):
+    moves = motion(GCodeParser.parse_program(program, ModalState()))
+    expected = legacy_moves(program)
+    assert len(moves) == len(expected)
+    for move, old in zip(moves, expected):
+        assert ('G00', 'G01', 'ARC')[move['type']] == old['type']
+        assert (move['x'], move['y'], move['z']) == pytest.approx((old['x'], old['y'], old['z']))
+        if old['type'] != 'G00':
+            assert move['f'] == pytest.approx(old['f'])
+        if old['type'] == 'ARC':
+            assert (move['cx'], move['cy']) == pytest.approx(tuple(old['center'][:2]))
+            assert move['radius'] == pytest.approx(old['radius'])
+            assert move['start_angle'] == pytest.approx(old['start_angle'])
+            assert move['end_angle'] - move['start_angle'] == pytest.approx(old['end_angle'] - old['start_angle'])
+
+
+def test_parse_matches_parse_program_line_by_line(program):
+    moves = motion(GCodeParser.parse_program(program, ModalState()))
+    position = [0.0, 0.0, 5.0]
+    feedrate = 1000
+    parsed_moves = []
+    for line in program:
+        parsed = GCodeParser.parse(line, position, feedrate)
+        if parsed['type'] == 'UPDATE_FEED':
+            feedrate = parsed['f']
+        elif parsed['type'] in ('G00', 'G01', 'ARC'):
+            if parsed['type'] != 'G00':
+                feedrate = parsed['f']
+            parsed_moves.append(parsed)
+            position = [parsed['x'], parsed['y'], parsed['z']]
+    assert [(m['x'], m['y'], m['z']) for m in parsed_moves] == pytest.approx(
+        [tuple(p) for p in np.column_stack((moves['x'], moves['y'], moves['z']))]
+    )
+
+
+def test_streaming_chunks_match_whole_program(program):
+    whole = GCodeParser.parse_program(program, ModalState())
+    chunked = np.concatenate(list(GCodeParser.iter_program(program, ModalState(), chunk_size=7)))
+    assert np.array_equal(whole, chunked)
+
+
+def test_bytes_and_lines_parse_identically(program):
+    from_lines = GCodeParser.parse_program(program, ModalState())
+    from_bytes = GCodeParser.parse_program("\n".join(program).encode(), ModalState())
+    assert np.array_equal(from_lines, from_bytes)
+
+
+def test_modal_motion_comments_and_case():
+    moves = GCodeParser.parse_program([
+        "g1 x10 f600 ; komentarz X99",
+        "y5 (Z-50)",
+        "G0 Z3",
+        "X1"
+    ], ModalState((0.0, 0.0, 5.0)))
+    assert list(moves['type']) == [MOVE_G01, MOVE_G01, MOVE_G00, MOVE_G00]
+    assert list(moves['x']) == [10, 10, 10, 1]
+    assert list(moves['y']) == [0, 5, 5, 5]
+    assert list(moves['z']) == [5, 5, 3, 3]
+    assert moves['f'][1] == 600
+    assert list(moves['line']) == [0, 1, 2, 3]
+
+
+def test_tool_change_spindle_and_units():
+    moves = GCodeParser.parse_program(["T2 M6 ; SREDNICA 6", "M3", "G20", "G1 X1 F10", "M5"], ModalState())
+    assert list(moves['type']) == [MOVE_TOOL_CHANGE, MOVE_SPINDLE_START, MOVE_G01, MOVE_SPINDLE_STOP]
+    assert moves['radius'][0] == 3
+    assert moves['x'][2] == pytest.approx(INCH)
+    assert moves['f'][2] == pytest.approx(10 * INCH)
+
+
+def test_arc_by_radius():
+    moves = GCodeParser.parse_program(["G0 X0 Y0 Z0", "G02 X10 Y0 R5 F100"], ModalState())
+    arc = moves[-1]
+    assert arc['type'] == MOVE_ARC
+    assert (arc['cx'], arc['cy'], arc['radius']) == pytest.approx((5, 0, 5))
+    assert arc['end_angle'] - arc['start_angle'] == pytest.approx(-math.pi)
+
+
+def test_invalid_arc_is_skipped(capsys):
+    moves = GCodeParser.parse_program(["G0 X0 Y0", "G02 X100 Y0 R5", "G1 X1"], ModalState())
+    assert list(moves['type']) == [MOVE_G00, MOVE_G01]
+    assert "linii 2" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("program", [
+    ["G0 X0 Y0 Z0", "G2 X100 Y0 R5", "G2 X0 Y10 R6"],
+    ["G0 X0 Y0 Z0", "G2 X100 Y0 R5", "G3 X100 Y0 R1", "G2 X0 Y10 R6", "G1 X3"],
+])
+def test_invalid_arc_does_not_drop_later_arcs(program):
+    whole = GCodeParser.parse_program(program, ModalState())
+    chunked = np.concatenate(list(GCodeParser.iter_program(program, ModalState(), chunk_size=1)))
+    assert np.array_equal(whole, chunked)
+    assert whole['line'][-1] == len(program) - 1
+
+
+def test_state_carries_between_calls():
+    state = ModalState()
+    GCodeParser.parse_program(["G1 X4 Y2 F300"], state)
+    moves = GCodeParser.parse_program(["Z-1"], state)
+    assert (moves['x'][0], moves['y'][0], moves['z'][0], moves['f'][0]) == (4, 2, -1, 300)
+    assert moves['line'][0] == 1
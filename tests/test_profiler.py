@@ -0,0 +1,46 @@
+import threading
+from profiler_occ import Profiler
+
+
+class Worker:
+    def step(self, line):
+        return self.boolean()
+
+    def boolean(self):
+        return True
+
+
+def test_instrumenting_an_instance_leaves_other_instances_alone():
+    profiler = Profiler()
+    measured, other = Worker(), Worker()
+    profiler.instrument(measured, 'boolean', phase='boolean')
+    measured.boolean()
+    other.boolean()
+    assert profiler.totals['boolean'][0] == 1
+    profiler.restore()
+    assert 'boolean' not in measured.__dict__
+
+
+def test_line_attribution_and_nesting():
+    profiler = Profiler()
+    worker = Worker()
+    profiler.instrument(worker, 'step', phase='move', line_of=lambda line: line)
+    profiler.instrument(worker, 'boolean', phase='boolean')
+    worker.step(4)
+    assert profiler.by_line[(4, 'boolean')][0] == 1
+    assert profiler.by_line[(4, 'move')][1] <= profiler.totals['move'][1]
+
+
+def test_trace_is_capped_but_totals_count_every_call():
+    profiler = Profiler(max_events=10)
+    worker = Worker()
+    profiler.instrument(worker, 'boolean', phase='boolean')
+    threads = [threading.Thread(target=lambda: [worker.boolean() for _ in range(500)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(profiler.events) == 10
+    assert profiler.dropped == 1990
+    assert profiler.totals['boolean'][0] == 2000
+    assert "Pominięto" in profiler.report()
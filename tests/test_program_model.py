@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from function_occ import GCodeParser, ModalState
+from program_occ import ProgramModel
+
+
+def full_parse(lines):
+    return GCodeParser.parse_program(lines, ModalState())
+
+
+def big_program(app, copies=20):
+    lines = []
+    for i in range(copies):
+        lines += app.rectangular_pocket_mill(2 + i, 2, 16, 12, 3, 1, 2000, 2)
+    return lines
+
+
+def test_incremental_updates_match_full_parse(app):
+    lines = big_program(app)
+    model = ProgramModel(block_lines=64)
+    model.update(lines)
+    assert np.array_equal(model.moves(), full_parse(lines))
+
+    edits = [
+        lambda l: l.__setitem__(100, "G1 X7 Y7"),
+        lambda l: l.insert(300, "G0 Z20"),
+        lambda l: l.__delitem__(500),
+        lambda l: l.__setitem__(slice(10, 12), ["F50"]),
+        lambda l: l.append("G1 Z-9")
+    ]
+    for edit in edits:
+        edit(lines)
+        model.update(lines)
+        assert np.array_equal(model.moves(), full_parse(lines))
+
+
+def test_unchanged_program_is_not_reparsed(app):
+    lines = big_program(app)
+    model = ProgramModel(block_lines=64)
+    model.update(lines)
+    assert model.update(list(lines)) is None
+
+
+def test_replacing_a_line_reuses_later_blocks(app):
+    lines = big_program(app)
+    model = ProgramModel(block_lines=64)
+    model.update(lines)
+    blocks = list(model.blocks)
+    lines[100] = "G1 X7 Y7"
+    assert model.update(lines) == 100
+    reused = sum(1 for block in model.blocks if any(block is old for old in blocks))
+    assert reused >= len(blocks) - 2
+
+
+@pytest.mark.parametrize("edit", [
+    lambda l: l.insert(100, "G0 Z20"),
+    lambda l: l.__delitem__(100),
+    lambda l: l.__setitem__(slice(100, 101), ["G0 Z20", "G0 Z5", "G1 X3 Y3"]),
+])
+def test_inserting_or_deleting_lines_reuses_later_blocks(app, edit):
+    lines = big_program(app)
+    model = ProgramModel(block_lines=64)
+    model.update(lines)
+    blocks = list(model.blocks)
+    edit(lines)
+    assert model.update(lines) == 100
+    assert np.array_equal(model.moves(), full_parse(lines))
+    reused = sum(1 for block in model.blocks if any(block is old for old in blocks))
+    assert reused >= len(blocks) - 2
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from function_occ import GCodeParser, ModalState
+from estimator_occ import TimeEstimator
+from simulation_occ import MachiningSimulation, simulate, START_POSITION
+from stock_occ import ZMapStock
+
+HELIX = ["G00 X10 Y10 Z1", "G01 Z-1 F500", "G02 X20 Y10 Z-3 I5 J0", "G00 Z5"]
+
+
+def test_headless_zmap_run(program):
+    result = simulate(program, 60, 60, 10)
+    moves = GCodeParser.parse_program(program, ModalState(START_POSITION))
+    stats = result['stats']
+    assert stats['engine'] == 'zmap'
+    assert stats['moves'] == len(moves)
+    assert stats['cutting_moves'] + stats['rapid_moves'] <= len(moves)
+    assert stats['removing_moves'] == np.count_nonzero(result['log']['removed']) > 0
+    assert np.array_equal(result['log']['line'], moves['line'])
+    assert result['stock'].volume() < 60 * 60 * 10
+
+
+def test_text_and_parsed_moves_simulate_identically(program):
+    moves = GCodeParser.parse_program(program, ModalState(START_POSITION))
+    text = simulate(program, 60, 60, 10)['stock']
+    parsed = simulate(moves, 60, 60, 10)['stock']
+    assert np.array_equal(text.field.z, parsed.field.z)
+
+
+@pytest.mark.parametrize("tool_radius", [0.5, 3.0])
+def test_machining_time_uses_simulation_tool_radius(tool_radius):
+    moves = GCodeParser.parse_program(HELIX, ModalState(START_POSITION))
+    stats = simulate(moves, 30, 30, 5, tool_radius=tool_radius)['stats']
+    expected = TimeEstimator.estimate(moves, START_POSITION, tool_radius=tool_radius)['total']
+    assert stats['machining_time'] == pytest.approx(expected)
+
+
+def test_helical_arc_matches_cut_arc():
+    moves = GCodeParser.parse_program(HELIX, ModalState(START_POSITION))
+    simulation = MachiningSimulation(30, 30, 5)
+    simulation.run(moves)
+
+    stock = ZMapStock(30, 30, 5)
+    stock.cut_line((10, 10, 1), (10, 10, -1), simulation.tool_radius, simulation.tool_length)
+    arc = moves[2]
+    stock.cut_arc(
+        (arc['cx'], arc['cy']), arc['radius'], arc['start_angle'], arc['end_angle'], -1.0, -3.0,
+        simulation.tool_radius, simulation.tool_length
+    )
+    assert np.array_equal(simulation.stock.field.z, stock.field.z)
+    assert stock.field.z.min() == -3
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from simulation_occ import MachiningSimulation, simulate
+from timeline_occ import Timeline
+
+STOCK = (60, 60, 10)
+
+
+def make_timeline(program, **options):
+    options.setdefault('keyframe_moves', 10)
+    options.setdefault('keyframe_seconds', float('inf'))
+    return Timeline(MachiningSimulation(*STOCK), **options).build(program)
+
+
+def fresh_stock(program, end):
+    return simulate(program[:end], *STOCK)['stock'].field.z
+
+
+def test_build_ends_with_whole_program(program):
+    timeline = make_timeline(program)
+    assert timeline.index == len(timeline.moves)
+    assert timeline.indices == sorted(set(timeline.indices))
+    assert len(timeline.keyframes) == len(timeline.moves) // 10 + 1
+    assert np.array_equal(timeline.simulation.stock.field.z, fresh_stock(program, len(program)))
+
+
+@pytest.mark.parametrize("lines", [[40, 10, 84, 0, 55], [3, 3, 70, 69]])
+def test_seek_matches_fresh_simulation(program, lines):
+    timeline = make_timeline(program)
+    for line in lines:
+        stock = timeline.seek(line)
+        assert np.array_equal(stock.field.z, fresh_stock(program, line + 1))
+
+
+def test_keyframes_spill_over_memory_budget(program):
+    timeline = make_timeline(program, memory_budget=1)
+    try:
+        report = timeline.report()
+        assert report['in_memory'] == 1
+        assert report['spilled'] == report['keyframes'] - 1
+        stock = timeline.seek(20)
+        assert np.array_equal(stock.field.z, fresh_stock(program, 21))
+    finally:
+        timeline.close()
+    assert timeline.spill_dir is None
+
+
+def edited(program, line, text):
+    return program[:line] + [text] + program[line + 1:]
+
+
+def test_unchanged_program_needs_no_update(program):
+    timeline = make_timeline(program)
+    assert timeline.update(list(program)) is None
+    assert not timeline.pending
+
+
+@pytest.mark.parametrize("line", [0, 25, 47, 84])
+def test_update_resumes_from_last_unchanged_keyframe(program, line):
+    timeline = make_timeline(program)
+    changed = edited(program, line, "G00 X1 Y1 Z5")
+    keyframe = timeline.update(changed)
+
+    first = int(np.argmax(timeline.moves['line'] >= line))
+    assert keyframe.index == max(index for index in timeline.indices if index <= first)
+    assert timeline.indices[-1] == keyframe.index
+    assert timeline.pending
+    stock = simulate(timeline.moves[:keyframe.index], *STOCK)['stock']
+    assert np.array_equal(timeline.simulation.stock.field.z, stock.field.z)
+
+
+def test_modal_change_invalidates_later_keyframes(program):
+    timeline = make_timeline(program)
+    # Inny posuw zmienia wiersze wszystkich dalszych ruchów, choć ich tekst jest ten sam.
+    assert program[2] == "F2000"
+    keyframe = timeline.update(edited(program, 2, "F1000"))
+    assert keyframe.index == 0
+    assert len(timeline.keyframes) == 1
+
+
+def test_finish_matches_fresh_build(program):
+    timeline = make_timeline(program)
+    changed = edited(program, 47, "G00 X1 Y1 Z5")
+    timeline.update(changed)
+    timeline.finish()
+    fresh = make_timeline(changed)
+    assert not timeline.pending
+    assert timeline.indices == fresh.indices
+    assert [k.digest for k in timeline.keyframes] == [k.digest for k in fresh.keyframes]
+    assert np.array_equal(timeline.simulation.stock.field.z, fresh.simulation.stock.field.z)
+
+
+def test_seek_before_finish(program):
+    timeline = make_timeline(program)
+    changed = edited(program, 25, "G00 X1 Y1 Z5")
+    timeline.update(changed)
+    stock = timeline.seek(60)
+    assert np.array_equal(stock.field.z, fresh_stock(changed, 61))
+    timeline.finish()
+    assert np.array_equal(timeline.simulation.stock.field.z, fresh_stock(changed, len(changed)))
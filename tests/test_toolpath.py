@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import toolpath_occ as tp
+import legacy
+
+
+def test_number_formatting():
+    points = tp.waypoints(7)
+    points['x'] = [0, -0.0004, 12345.678, -99999999.5, 10000, 10000.001, 0.1]
+    points['f'][1:3] = [1, 15000]
+    assert tp.gcode_lines(points) == [
+        "G01 X0", "G01 X0 F1", "G01 X12345.678 F15000", "G01 X-99999999.5",
+        "G01 X10000", "G01 X10000.001", "G01 X0.1"
+    ]
+
+
+def test_words_only_line_has_no_leading_space():
+    assert tp.gcode_lines(tp.waypoint(tp.CODE_WORDS_ONLY, f=800)) == ["F800"]
+    assert tp.gcode_lines(tp.waypoint(tp.CODE_SPINDLE_ON)) == ["M03"]
+
+
+def test_chunks_join_to_whole_text():
+    points = tp.rectangular_pocket(0, 0, 60, 40, 4, 1, 1000, 1)
+    whole = b"".join(tp.iter_gcode(points))
+    assert b"".join(tp.iter_gcode(points, chunk_lines=17)) == whole
+    assert whole.count(b"\n") == len(points)
+
+
+def test_random_values_round_trip():
+    rng = np.random.default_rng(5)
+    points = tp.waypoints(1000)
+    points['x'] = np.round(rng.uniform(-5000, 5000, 1000), 3)
+    for line, value in zip(tp.gcode_lines(points), points['x']):
+        assert float(line.split("X")[1]) == pytest.approx(value, abs=1e-9)
+
+
+def test_drill_many_holes():
+    lines = tp.gcode_lines(tp.drill([1, 2.5], [-3, 4.125], 2, 100))
+    assert lines == [
+        "G00 X1 Y-3 Z5", "F100", "M03", "M08", "G01 Z-2", "G00 Z5", "M09",
+        "G00 X2.5 Y4.125 Z5", "F100", "M03", "M08", "G01 Z-2", "G00 Z5", "M09"
+    ]
+
+
+def test_depth_is_required():
+    with pytest.raises(ValueError):
+        tp.drill(1, 2)
+
+
+def words(lines):
+    # G0 i G00 albo M3 i M03 to te same kody, dlatego porównywane są wartości liczbowe słów.
+    return [[(part[0], float(part[1:])) for part in line.split()] for line in lines]
+
+
+@pytest.mark.parametrize("args", [
+    (0, 0, 50, 30, 3, 1, 1000, 3),
+    (2, 2, 16, 12, 3, 1, 2000, 2),
+    (5, 5, 20, 40, 2.5, 1, 800, 2),
+    (0, 0, 50, 30, 0.5, 1, 1000, 3),
+    (1, 1, 4, 4, 2, 1, 500, 3),
+])
+def test_rectangular_pocket_matches_legacy(args):
+    assert words(tp.gcode_lines(tp.rectangular_pocket(*args))) == words(legacy.rectangular_pocket_mill(*args))
+
+
+@pytest.mark.parametrize("args", [
+    (30, 10, 12, 3, 1, 1500, 2),
+    (30, 10, 13, 2.5, 1, 1500, 2),
+    (0, 10, 13, 2, 1, 1500, 2),
+    (30, 10, 12, 0.5, 1, 1500, 2),
+    (30, 10, 12, 0, 1, 1500, 2),
+])
+def test_circular_pocket_matches_legacy(args):
+    assert words(tp.gcode_lines(tp.circular_pocket(*args))) == words(legacy.circular_pocket_mill(*args))
+
+
+@pytest.mark.parametrize("generator, old", [(tp.drill, legacy.drill_material), (tp.bore, legacy.bore_material)])
+@pytest.mark.parametrize("args", [(45, 5, 5, 300), (None, 2.5, 1.25, None), (1.0004, None, 3, 100)])
+def test_holes_match_legacy(generator, old, args):
+    assert words(tp.gcode_lines(generator(*args))) == words(old(*args))
@@ -0,0 +1,56 @@
+import threading
+import time
+import pytest
+from worker_occ import ProgressReporter, SimulationCancelled
+
+
+def reporter(total=10, interval=0.0):
+    messages = []
+    return ProgressReporter(messages.append, total, interval), messages
+
+
+def test_progress_fraction_and_eta():
+    progress, messages = reporter()
+    assert progress.update(5, 7) == 0.0
+    name, line, fraction, eta = messages[-1]
+    assert (name, line, fraction) == ('progress', 7, 0.5)
+    assert eta == pytest.approx(time.perf_counter() - progress.started, abs=0.05)
+
+    ProgressReporter(messages.append).update(5, 8)
+    assert messages[-1][2:] == (None, None)
+
+
+def test_updates_are_throttled():
+    progress, messages = reporter(interval=60)
+    progress.update(1, 1)
+    progress.update(2, 2)
+    assert len(messages) == 1
+    progress.command('cancel')
+    with pytest.raises(SimulationCancelled):
+        progress.update(3, 3)
+
+
+def test_pause_blocks_until_resume():
+    progress, messages = reporter(interval=60)
+    progress.update(1, 1)
+    progress.command('pause')
+    assert messages[-1] == ('paused',)
+
+    timer = threading.Timer(0.2, progress.command, ('resume',))
+    timer.start()
+    paused = progress.update(5, 5)
+    timer.join()
+    assert paused >= 0.15
+    assert progress.paused_time == paused
+    # Czas pauzy nie wlicza się do szacowanego czasu do końca.
+    assert 0 <= messages[-1][3] < 0.15
+
+
+def test_cancel_while_paused():
+    progress, messages = reporter()
+    progress.command('pause')
+    threading.Timer(0.05, progress.command, ('cancel',)).start()
+    with pytest.raises(SimulationCancelled):
+        progress.update(1, 1)
+    progress.finish(('cancelled',))
+    assert messages[-1] == ('cancelled',)
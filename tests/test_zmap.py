@@ -0,0 +1,39 @@
+import math
+import pytest
+from zmap_occ import HeightField
+
+
+def test_plunge_removes_cylinder():
+    field = HeightField(40, 40, 10, resolution=0.1)
+    assert field.cut((20, 20, 5), (20, 20, -2), 3)
+    assert field.removed_volume() == pytest.approx(math.pi * 9 * 2, rel=0.02)
+    assert field.volume() == pytest.approx(40 * 40 * 10 - math.pi * 9 * 2, rel=1e-4)
+
+
+def test_slot_volume_and_depth_limit():
+    field = HeightField(50, 20, 4, resolution=0.1)
+    field.cut((10, 10, -1), (40, 10, -1), 2)
+    assert field.removed_volume() == pytest.approx((30 * 4 + math.pi * 4) * 1, rel=0.02)
+    field.cut((10, 10, -10), (10, 10, -10), 1)
+    assert field.z.min() == -4
+
+
+def test_cut_above_stock_changes_nothing():
+    field = HeightField(10, 10, 5)
+    assert not field.cut((0, 0, 1), (10, 10, 1), 2)
+    assert field.removed_volume() == 0
+
+
+def test_penetration_after_cut():
+    field = HeightField(30, 30, 10, resolution=0.25)
+    field.cut((5, 15, -3), (25, 15, -3), 2)
+    assert field.penetration((5, 15, -2), (25, 15, -2), 1) == 0.0
+    assert field.penetration((5, 5, -2), (25, 5, -2), 1) == pytest.approx(2.0)
+
+
+def test_copy_is_independent():
+    field = HeightField(10, 10, 5)
+    copy = field.copy()
+    copy.cut((5, 5, -1), (5, 5, -1), 2)
+    assert field.removed_volume() == 0
+    assert copy.removed_volume() > 0
@@ -0,0 +1,207 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from bisect import bisect_right
+import numpy as np
+from function_occ import GCodeParser, ModalState, ARC_TOLERANCE
+from stock_occ import DEFAULT_ENGINE
+from simulation_occ import MachiningSimulation
+
+KEYFRAME_MOVES = 500
+KEYFRAME_SECONDS = 0.5
+KEYFRAME_MEMORY = 256 << 20
+
+
+class Keyframe:
+    def __init__(self, index, line, position, tool_radius, data, hasher):
+        self.index = index
+        self.line = line
+        self.position = position
+        self.tool_radius = tool_radius
+        self.data = data
+        self.size = len(data)
+        self.path = None
+        self.hasher = hasher
+        self.digest = hasher.digest()
+
+    def spill(self, directory):
+        self.path = os.path.join(directory, f"{self.index}.keyframe")
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+        self.data = None
+
+    def load(self):
+        if self.data is not None:
+            return self.data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def __getstate__(self):
+        # Do innego procesu trafia sama zawartość klatki, bez skrótu prefiksu i pliku na dysku.
+        return dict(self.__dict__, data=self.load(), path=None, hasher=None)
+
+    def discard(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Timeline:
+    def __init__(self, simulation, keyframe_moves=KEYFRAME_MOVES, keyframe_seconds=KEYFRAME_SECONDS,
+                 memory_budget=KEYFRAME_MEMORY, spill_dir=None):
+        self.simulation = simulation
+        self.keyframe_moves = keyframe_moves
+        self.keyframe_seconds = keyframe_seconds
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self._temporary_dir = None
+        self.moves = None
+        self.keyframes = []
+        self.indices = []
+        self.memory = 0
+        self.spilled = 0
+        self.index = 0
+        self.pending = False
+        self.hasher = None
+        self.seed = repr((
+            simulation.engine, simulation.arc_tolerance, simulation.start_position,
+            simulation.tool_radius, simulation.tool_length
+        )).encode('utf-8')
+
+    def _spill_directory(self):
+        if self.spill_dir is None:
+            self._temporary_dir = tempfile.mkdtemp(prefix="symulacja_")
+            self.spill_dir = self._temporary_dir
+        return self.spill_dir
+
+    def _keyframe(self, index):
+        simulation = self.simulation
+        if self.hasher is None:
+            self.hasher = hashlib.blake2b(self.seed)
+        else:
+            self.hasher.update(self.moves[self.indices[-1]:index].tobytes())
+        line = int(self.moves['line'][index - 1]) if index else -1
+        keyframe = Keyframe(
+            index, line, simulation.position, simulation.tool_radius, simulation.stock.snapshot(),
+            self.hasher.copy()
+        )
+        self.keyframes.append(keyframe)
+        self.indices.append(index)
+        self.memory += keyframe.size
+
+        # Po przekroczeniu budżetu najstarsze klatki trafiają na dysk, najnowsze zostają w pamięci.
+        while self.memory > self.memory_budget and self.spilled < len(self.keyframes) - 1:
+            oldest = self.keyframes[self.spilled]
+            oldest.spill(self._spill_directory())
+            self.memory -= oldest.size
+            self.spilled += 1
+
+    def _parse(self, commands):
+        if isinstance(commands, np.ndarray):
+            return commands
+        return GCodeParser.parse_program(commands, ModalState(self.simulation.start_position))
+
+    def build(self, commands):
+        self.moves = self._parse(commands)
+        self._keyframe(0)
+        self._simulate()
+        return self
+
+    def _restore(self, keyframe):
+        simulation = self.simulation
+        simulation.stock.restore(keyframe.load())
+        simulation.position = keyframe.position
+        simulation.tool_radius = keyframe.tool_radius
+        self.index = keyframe.index
+
+    def update(self, commands):
+        moves = self._parse(commands)
+        if self.moves is not None and np.array_equal(moves, self.moves):
+            return None
+
+        # Wiersze ruchów zawierają już rozwiązany stan modalny (pozycja, posuw, promień narzędzia),
+        # więc skrót prefiksu programu wystarcza, by stwierdzić, czy klatka jest nadal aktualna.
+        hasher = hashlib.blake2b(self.seed)
+        resume = 0
+        for position, keyframe in enumerate(self.keyframes[1:], start=1):
+            if keyframe.index > len(moves):
+                break
+            hasher.update(moves[self.indices[position - 1]:keyframe.index].tobytes())
+            if hasher.digest() != keyframe.digest:
+                break
+            resume = position
+
+        for keyframe in self.keyframes[resume + 1:]:
+            keyframe.discard()
+            if keyframe.data is not None:
+                self.memory -= keyframe.size
+        del self.keyframes[resume + 1:]
+        del self.indices[resume + 1:]
+        self.spilled = min(self.spilled, resume + 1)
+
+        # Dalsze klatki liczy dopiero finish(), więc wznowienie animacji nie czeka na symulację reszty.
+        keyframe = self.keyframes[resume]
+        self.moves = moves
+        self.hasher = keyframe.hasher.copy()
+        self._restore(keyframe)
+        self.pending = True
+        return keyframe
+
+    def finish(self):
+        if not self.pending:
+            return self
+        if self.index != self.indices[-1]:
+            self._restore(self.keyframes[-1])
+        self._simulate()
+        return self
+
+    def _simulate(self):
+        simulation = self.simulation
+        start = self.indices[-1]
+        last = time.perf_counter()
+        for index, move in enumerate(self.moves[start:], start=start + 1):
+            simulation.step(move)
+            if (index - self.indices[-1] >= self.keyframe_moves
+                    or time.perf_counter() - last >= self.keyframe_seconds):
+                self._keyframe(index)
+                last = time.perf_counter()
+        simulation.stock.flush()
+        self.index = len(self.moves)
+        self.pending = False
+
+    def seek(self, line):
+        simulation = self.simulation
+        target = int(np.searchsorted(self.moves['line'], line, side='right'))
+        keyframe = self.keyframes[bisect_right(self.indices, target) - 1]
+
+        # Jeśli bieżący stan leży między klatką kluczową a celem, wystarczy symulować dalej.
+        if not keyframe.index <= self.index <= target:
+            self._restore(keyframe)
+        for move in self.moves[self.index:target]:
+            simulation.step(move)
+        simulation.stock.flush()
+        self.index = target
+        return simulation.stock
+
+    def report(self):
+        return {
+            'keyframes': len(self.keyframes),
+            'in_memory': len(self.keyframes) - self.spilled,
+            'spilled': self.spilled,
+            'memory': self.memory
+        }
+
+    def close(self):
+        for keyframe in self.keyframes:
+            keyframe.discard()
+        if self._temporary_dir is not None:
+            shutil.rmtree(self._temporary_dir, ignore_errors=True)
+            self._temporary_dir = None
+            self.spill_dir = None
+
+
+def build_timeline(commands, width, length, height, engine=DEFAULT_ENGINE, arc_tolerance=ARC_TOLERANCE,
+                   **options):
+    simulation = MachiningSimulation(width, length, height, engine, arc_tolerance, **options)
+    return Timeline(simulation).build(commands)
@@ -0,0 +1,299 @@
+import argparse
+import time
+import numpy as np
+
+SAFE_Z = 5.0
+FORMAT_CHUNK_LINES = 1 << 14
+DECIMALS = 3
+
+CODE_RAPID = 0
+CODE_FEED = 1
+CODE_ARC_CW = 2
+CODE_ARC_CCW = 3
+CODE_SPINDLE_ON = 4
+CODE_SPINDLE_OFF = 5
+CODE_COOLANT_ON = 6
+CODE_COOLANT_OFF = 7
+CODE_WORDS_ONLY = 8
+CODE_WORDS = np.array([b"G00", b"G01", b"G02", b"G03", b"M03", b"M05", b"M08", b"M09", b""], dtype='S3')
+
+# Słowa adresowe w kolejności zapisu; NaN oznacza, że słowo nie występuje w linii.
+WAYPOINT_FIELDS = ('x', 'y', 'z', 'i', 'j', 'f')
+WAYPOINT_DTYPE = np.dtype([('code', np.uint8)] + [(name, np.float64) for name in WAYPOINT_FIELDS])
+
+
+def waypoints(count, code=CODE_FEED):
+    points = np.empty(count, dtype=WAYPOINT_DTYPE)
+    points['code'] = code
+    for name in WAYPOINT_FIELDS:
+        points[name] = np.nan
+    return points
+
+
+def waypoint(code, **words):
+    point = waypoints(1, code)
+    for name, value in words.items():
+        if value is not None:
+            point[name] = value
+    return point
+
+
+def _feed_header(x, y, feedrate):
+    header = [waypoint(CODE_RAPID, x=x, y=y, z=SAFE_Z)]
+    if feedrate is not None and feedrate > 0:
+        header.append(waypoint(CODE_WORDS_ONLY, f=feedrate))
+    return header
+
+
+def rectangular_pocket(x, y, width, height, depth, stepdown, feedrate, tool_radius):
+    r = tool_radius
+    levels = np.round(np.arange(1, int(depth / stepdown) + 1) * stepdown, DECIMALS)
+    levels = levels[levels != 0.0]
+
+    # Kolejne obwiednie są węższe o średnicę narzędzia, aż kieszeń zostanie wypełniona.
+    start_width = round(width - 2 * r, DECIMALS)
+    start_height = round(height - 2 * r, DECIMALS)
+    k = np.arange(max(int(min(start_width, start_height) / (2 * r)) + 2, 0))
+    inside = (np.round(start_width - 2 * k * r, DECIMALS) > 0) & (np.round(start_height - 2 * k * r, DECIMALS) > 0)
+    k = k[:np.argmin(inside)] if not inside.all() else k
+    left = x + r + k * r
+    bottom = y + r + k * r
+    right = left + start_width - 2 * k * r
+    top = bottom + start_height - 2 * k * r
+    ring_x = np.column_stack((left, right, right, left, left)).ravel()
+    ring_y = np.column_stack((bottom, bottom, top, top, bottom)).ravel()
+
+    body = waypoints(len(levels) * (1 + len(ring_x))).reshape(len(levels), 1 + len(ring_x))
+    body['z'][:, 0] = -levels
+    body['x'][:, 1:] = ring_x
+    body['y'][:, 1:] = ring_y
+
+    tail = []
+    if width > height:
+        side = height / 2
+        tail.append((x + side, y + height - side))
+    else:
+        side = width / 2
+        tail += [
+            (x + side, y + side),
+            (x + width - r, y + r),
+            (x + side, y + side),
+            (x + side, y + height - side),
+            (x + r, y + height - r),
+            (x + side, y + height - side),
+            (x + width - r, y + height - r)
+        ]
+    finish = waypoints(len(tail))
+    if tail:
+        finish['x'], finish['y'] = np.array(tail).T
+
+    return np.concatenate(
+        _feed_header(x + r, y + r, feedrate)
+        + [waypoint(CODE_SPINDLE_ON), body.ravel(), finish, waypoint(CODE_SPINDLE_OFF)]
+    )
+
+
+def circular_pocket(x, y, diameter, depth, stepdown, feedrate, tool_radius):
+    r = tool_radius
+    steps_number = depth / stepdown
+    levels = -stepdown * np.arange(1, int(steps_number) + 1)
+    if steps_number % 1 != 0:
+        last = levels[-1] if len(levels) else 0.0
+        levels = np.append(levels, round(last - (depth - int(steps_number) * stepdown), DECIMALS))
+
+    # Okręgi zaczynają się coraz dalej od środka, więc promień rośnie o promień narzędzia.
+    rotations_number = diameter / (2 * r)
+    if rotations_number % 1 != 0:
+        rotations = x - r * np.arange(int(rotations_number))
+        edge = x - diameter / 2 + r
+        if edge != 0 and x != 0:
+            rotations = np.append(rotations, edge)[1:]
+    else:
+        rotations = x - r * np.arange(1, int(rotations_number) + 1)
+    last_rotation = rotations[-1] if len(rotations) else None
+    rotations = rotations[rotations != x]
+    radii = r * np.arange(1, len(rotations) + 1, dtype=np.float64)
+    if len(rotations) and last_rotation != x:
+        radii[-1] = x - last_rotation
+
+    body = waypoints(len(levels) * (2 + 2 * len(rotations))).reshape(len(levels), 2 + 2 * len(rotations))
+    body['x'][:, 0] = x
+    body['y'][:, 0] = y
+    body['z'][:, 1] = levels
+    body['x'][:, 2::2] = rotations
+    arcs = body[:, 3::2]
+    arcs['code'] = CODE_ARC_CW
+    arcs['x'] = rotations
+    arcs['y'] = y
+    arcs['i'] = radii
+    arcs['j'] = 0.0
+    if feedrate is not None and feedrate > 0:
+        arcs['f'] = feedrate
+
+    return np.concatenate(
+        _feed_header(x, y, feedrate)
+        + [waypoint(CODE_SPINDLE_ON), body.ravel(), waypoint(CODE_RAPID, z=SAFE_Z), waypoint(CODE_SPINDLE_OFF)]
+    )
+
+
+def _holes(x, y, z, feedrate, before, after):
+    x, y, z = np.broadcast_arrays(
+        np.atleast_1d(np.nan if x is None else np.asarray(x, dtype=np.float64)),
+        np.atleast_1d(np.nan if y is None else np.asarray(y, dtype=np.float64)),
+        np.atleast_1d(np.asarray(z, dtype=np.float64))
+    )
+    template = [waypoint(CODE_RAPID, z=SAFE_Z)]
+    if feedrate is not None:
+        template.append(waypoint(CODE_WORDS_ONLY, f=feedrate))
+    template += [waypoint(code) for code in before]
+    plunge = len(template)
+    template += [waypoint(CODE_FEED), waypoint(CODE_RAPID, z=SAFE_Z)]
+    template += [waypoint(code) for code in after]
+
+    # Ten sam blok jest powielany dla każdego otworu, zmieniają się tylko współrzędne.
+    block = np.tile(np.concatenate(template), (len(x), 1))
+    block['x'][:, 0] = x
+    block['y'][:, 0] = y
+    block['z'][:, plunge] = -z
+    return block.ravel()
+
+
+def drill(x=None, y=None, z=None, feedrate=None):
+    if z is None:
+        raise ValueError("Z (głębokość) jest wymagana.")
+    return _holes(x, y, z, feedrate, (CODE_SPINDLE_ON, CODE_COOLANT_ON), (CODE_COOLANT_OFF,))
+
+
+def bore(x=None, y=None, z=None, feedrate=None):
+    if z is None:
+        raise ValueError("Z (głębokość) jest wymagana.")
+    return _holes(x, y, z, feedrate, (), ())
+
+
+def _digit_table(padded):
+    numbers = range(10 ** GROUP_DIGITS)
+    width = GROUP_DIGITS
+    text = np.array([f"{n:0{width}d}" if padded else f"{n:>{width}d}" for n in numbers], dtype=f'S{width}')
+    table = text.view(np.uint8).reshape(-1, width).copy()
+    table[table == ord(' ')] = 0
+    return table
+
+
+def _fraction_table():
+    text = [f".{n:0{DECIMALS}d}".rstrip('0').rstrip('.') for n in range(10 ** DECIMALS)]
+    return np.array(text, dtype=f'S{DECIMALS + 1}').view(np.uint8).reshape(-1, DECIMALS + 1)
+
+
+# Tablice gotowych cyfr: liczby są składane z kilku odczytów zamiast dzielenia cyfra po cyfrze.
+# Bajt 0 oznacza znak pominięty w wyniku (zera wiodące, końcowe zera części ułamkowej).
+GROUP_DIGITS = 4
+DIGITS = _digit_table(padded=False)
+DIGITS_PADDED = _digit_table(padded=True)
+FRACTIONS = _fraction_table()
+
+
+def _format_words(values, letter, started):
+    present = ~np.isnan(values)
+    if not present.any():
+        return None, present
+    scaled = np.rint(np.where(present, values, 0.0) * 10 ** DECIMALS).astype(np.int64)
+    whole, fraction = np.divmod(np.abs(scaled), 10 ** DECIMALS)
+
+    count = len(values)
+    columns = [
+        np.where(present & started, ord(' '), 0).astype(np.uint8)[:, None],
+        np.full((count, 1), letter, dtype=np.uint8),
+        np.where(scaled < 0, ord('-'), 0).astype(np.uint8)[:, None]
+    ]
+    groups = max(1, -(-len(str(int(whole.max()))) // GROUP_DIGITS))
+    for group in range(groups - 1, -1, -1):
+        base = 10 ** (GROUP_DIGITS * group)
+        part = whole // base % 10 ** GROUP_DIGITS
+        if group == groups - 1 and group == 0:
+            columns.append(DIGITS[part])
+            continue
+        text = np.where((whole >= base * 10 ** GROUP_DIGITS)[:, None], DIGITS_PADDED[part], DIGITS[part])
+        if group:
+            text[whole < base] = 0
+        columns.append(text)
+    columns.append(FRACTIONS[fraction])
+
+    text = np.concatenate(columns, axis=1)
+    text[~present] = 0
+    return text, present
+
+
+def format_chunk(points):
+    count = len(points)
+    prefix = CODE_WORDS[points['code']].view(np.uint8).reshape(count, -1)
+    columns = [prefix]
+    started = (prefix != 0).any(axis=1)
+    for name in WAYPOINT_FIELDS:
+        text, present = _format_words(points[name], ord(name.upper()), started)
+        if text is not None:
+            columns.append(text)
+            started = started | present
+    columns.append(np.full((count, 1), ord('\n'), dtype=np.uint8))
+    # Usunięcie pominiętych bajtów zachowuje kolejność wierszy, więc daje gotowy tekst kolejnych linii.
+    text = np.concatenate(columns, axis=1)
+    return text[text != 0].tobytes()
+
+
+def iter_gcode(points, chunk_lines=FORMAT_CHUNK_LINES):
+    for start in range(0, len(points), chunk_lines):
+        yield format_chunk(points[start:start + chunk_lines])
+
+
+def gcode_lines(points):
+    return b"".join(iter_gcode(points)).decode('ascii').splitlines()
+
+
+def write_gcode(points, f, chunk_lines=FORMAT_CHUNK_LINES):
+    written = 0
+    for chunk in iter_gcode(points, chunk_lines):
+        f.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generowanie ścieżek kieszeni bez interfejsu graficznego")
+    parser.add_argument('operation', choices=('kieszen', 'kieszen-okragla'))
+    parser.add_argument('--x', type=float, default=0.0)
+    parser.add_argument('--y', type=float, default=0.0)
+    parser.add_argument('--width', type=float, help="szerokość kieszeni prostokątnej")
+    parser.add_argument('--height', type=float, help="długość kieszeni prostokątnej")
+    parser.add_argument('--diameter', type=float, help="średnica kieszeni okrągłej")
+    parser.add_argument('--depth', type=float, required=True)
+    parser.add_argument('--stepdown', type=float, required=True)
+    parser.add_argument('--feedrate', type=float, default=1000.0)
+    parser.add_argument('--tool-radius', type=float, required=True)
+    parser.add_argument('--output', required=True, help="plik wynikowy G-code")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.operation == 'kieszen':
+        if args.width is None or args.height is None:
+            parser.error("Kieszeń prostokątna wymaga --width i --height")
+        points = rectangular_pocket(
+            args.x, args.y, args.width, args.height, args.depth, args.stepdown, args.feedrate, args.tool_radius
+        )
+    else:
+        if args.diameter is None:
+            parser.error("Kieszeń okrągła wymaga --diameter")
+        points = circular_pocket(
+            args.x, args.y, args.diameter, args.depth, args.stepdown, args.feedrate, args.tool_radius
+        )
+    generated = time.perf_counter()
+    with open(args.output, 'wb') as f:
+        written = write_gcode(points, f)
+    finished = time.perf_counter()
+    print(
+        f"Wygenerowano {len(points)} linii w {generated - started:.2f} s, "
+        f"zapisano {written / 2**20:.1f} MB w {finished - generated:.2f} s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
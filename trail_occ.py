@@ -0,0 +1,85 @@
+import numpy as np
+
+TRAIL_CHUNK_POINTS = 2048
+TRAIL_INITIAL_CAPACITY = 4096
+
+
+def douglas_peucker(points, tolerance):
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        relative = points[first + 1:last] - points[first]
+        squared = segment @ segment
+        if squared > 0:
+            t = np.clip(relative @ segment / squared, 0.0, 1.0)
+            relative = relative - t[:, None] * segment
+        distance = np.einsum('ij,ij->i', relative, relative)
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance * tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return keep
+
+
+class TrailBuffer:
+    def __init__(self, chunk_points=TRAIL_CHUNK_POINTS, tolerance=None, capacity=TRAIL_INITIAL_CAPACITY):
+        self.chunk_points = chunk_points
+        self.tolerance = tolerance
+        self.points = np.empty((capacity, 3))
+        self.count = 0
+        self.chunk_start = 0
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, extra):
+        needed = self.count + extra
+        if needed <= len(self.points):
+            return
+        grown = np.empty((max(needed, 2 * len(self.points)), 3))
+        grown[:self.count] = self.points[:self.count]
+        self.points = grown
+
+    def extend(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self._reserve(len(points))
+        self.points[self.count:self.count + len(points)] = points
+        self.count += len(points)
+
+        closed = []
+        while self.count - self.chunk_start > self.chunk_points:
+            closed.append(self._close_chunk(self.chunk_start + self.chunk_points))
+        return closed
+
+    def _close_chunk(self, end):
+        start = self.chunk_start
+        if self.tolerance:
+            kept = self.points[start:end][douglas_peucker(self.points[start:end], self.tolerance)]
+            tail = self.points[end:self.count].copy()
+            end = start + len(kept)
+            self.points[start:end] = kept
+            self.points[end:end + len(tail)] = tail
+            self.count = end + len(tail)
+
+        # Kolejny fragment zaczyna się w ostatnim punkcie zamkniętego, żeby linia była ciągła.
+        self.chunk_start = end - 1
+        return self.points[start:end].copy()
+
+    def open_chunk(self):
+        return self.points[self.chunk_start:self.count]
+
+    def view(self):
+        return self.points[:self.count]
+
+    def clear(self):
+        self.count = 0
+        self.chunk_start = 0
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+PROGRESS_INTERVAL = 0.1
+PROGRESS_POLL_MS = 100
+
+
+class SimulationCancelled(Exception):
+    pass
+
+
+class ProgressReporter:
+    def __init__(self, send, total=None, interval=PROGRESS_INTERVAL):
+        self.send = send
+        self.total = total
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.reported = 0.0
+        self.paused_time = 0.0
+        self.running = threading.Event()
+        self.running.set()
+        self.cancelled = threading.Event()
+
+    def command(self, name):
+        if name == 'pause':
+            self.running.clear()
+            self.send(('paused',))
+        elif name == 'resume':
+            self.running.set()
+        elif name == 'cancel':
+            self.cancelled.set()
+            self.running.set()
+
+    def update(self, index, line):
+        now = time.perf_counter()
+        if now - self.reported < self.interval and self.running.is_set() and not self.cancelled.is_set():
+            return 0.0
+        self.reported = now
+
+        paused = 0.0
+        if not self.running.is_set():
+            self.running.wait()
+            paused = time.perf_counter() - now
+            self.paused_time += paused
+            now += paused
+        if self.cancelled.is_set():
+            raise SimulationCancelled()
+
+        fraction = index / self.total if self.total else None
+        eta = None
+        if fraction:
+            elapsed = now - self.started - self.paused_time
+            eta = elapsed * (1.0 - fraction) / fraction
+        self.send(('progress', line, fraction, eta))
+        return paused
+
+    def finish(self, status):
+        self.send(status)
+
+
+def _serve(connection):
+    # pythonOCC jest wczytywany od razu po starcie procesu, zanim przyjdzie pierwsze zlecenie.
+    from animation_occ import start_animation
+
+    lock = threading.Lock()
+    jobs = queue.Queue()
+    state = {'reporter': None, 'visualizer': None}
+
+    def send(message):
+        with lock:
+            connection.send(message)
+
+    def run_job(job):
+        commands = job['commands']
+        reporter = ProgressReporter(send, len(commands) - (job['resume'].index if job.get('resume') else 0))
+        state['reporter'] = reporter
+        try:
+            start_animation(
+                progress=reporter, visualizer=state['visualizer'], keep_open=False,
+                on_ready=lambda vis: state.__setitem__('visualizer', vis), **job
+            )
+        except Exception as e:
+            send(('error', str(e)))
+
+    def listen():
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                # Aplikacja została zamknięta, więc proces symulacji kończy się razem z nią.
+                os._exit(0)
+            name = message[0]
+            if name == 'run':
+                jobs.put(message[1])
+            elif name == 'show':
+                # Podgląd trafia do kolejki wątku okna i jest pomijany w trakcie animacji.
+                vis = state['visualizer']
+                if vis is not None and vis.engine == message[1] and not vis.running:
+                    vis.show_snapshot(message[2], message[3])
+            elif state['reporter'] is not None:
+                state['reporter'].command(name)
+
+    threading.Thread(target=listen, daemon=True).start()
+    send(('ready',))
+    # Wszystkie zlecenia działają w głównym wątku procesu, który jest właścicielem okna OCC;
+    # między nimi ten sam wątek obsługuje zdarzenia okna, aż zostanie ono zamknięte.
+    job = jobs.get()
+    while job is not None:
+        run_job(job)
+        vis = state['visualizer']
+        job = vis.wait_for(jobs) if vis is not None else None
+    send(('closed',))
+
+
+class SimulationProcess:
+    def __init__(self):
+        context = multiprocessing.get_context('spawn')
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.busy = False
+        self.ready = False
+        self.line = None
+        self.fraction = None
+        self.eta = None
+        self.state = None
+        self.error = None
+
+    def alive(self):
+        return self.process.is_alive() and self.state != 'closed'
+
+    def run(self, job):
+        self.busy = True
+        self.state = 'running'
+        self.line = self.fraction = self.eta = self.error = None
+        self.connection.send(('run', job))
+
+    def pause(self):
+        self.connection.send(('pause',))
+
+    def resume(self):
+        self.state = 'running'
+        self.connection.send(('resume',))
+
+    def cancel(self):
+        self.connection.send(('cancel',))
+
+    def show(self, engine, snapshot, position):
+        self.connection.send(('show', engine, snapshot, position))
+
+    def poll(self):
+        try:
+            while self.connection.poll():
+                message = self.connection.recv()
+                name = message[0]
+                if name == 'ready':
+                    self.ready = True
+                elif name == 'progress':
+                    _, self.line, self.fraction, self.eta = message
+                elif name == 'paused':
+                    self.state = 'paused'
+                elif name in ('finished', 'cancelled', 'error', 'closed'):
+                    self.busy = False
+                    self.state = name
+                    if name == 'error':
+                        self.error = message[1]
+        except (EOFError, OSError):
+            self.state = 'closed'
+        if not self.process.is_alive():
+            self.busy = False
+            self.state = 'closed'
+        return self.state
+
+    def close(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
@@ -0,0 +1,103 @@
+import math
+import numpy as np
+
+ZMAP_RESOLUTION = 0.5
+
+
+class HeightField:
+    def __init__(self, length, width, height, resolution=ZMAP_RESOLUTION, origin=(0.0, 0.0)):
+        self.length = length
+        self.width = width
+        self.height = height
+        nx = max(1, math.ceil(length / resolution))
+        ny = max(1, math.ceil(width / resolution))
+        self.cell = (length / nx, width / ny)
+        self.x = origin[0] + (np.arange(nx) + 0.5) * self.cell[0]
+        self.y = origin[1] + (np.arange(ny) + 0.5) * self.cell[1]
+        self.top = 0.0
+        self.bottom = -height
+        self.z = np.full((ny, nx), self.top)
+
+    def copy(self):
+        field = HeightField.__new__(HeightField)
+        field.__dict__.update(self.__dict__)
+        field.z = self.z.copy()
+        return field
+
+    def _sweep(self, start, end, radius):
+        x0, y0, z0 = start
+        x1, y1, z1 = end
+        i0, i1 = np.searchsorted(self.x, (min(x0, x1) - radius, max(x0, x1) + radius))
+        j0, j1 = np.searchsorted(self.y, (min(y0, y1) - radius, max(y0, y1) + radius))
+        if i0 == i1 or j0 == j1:
+            return None
+
+        cx = self.x[i0:i1][None, :] - x0
+        cy = self.y[j0:j1][:, None] - y0
+        dx = x1 - x0
+        dy = y1 - y0
+        squared = dx * dx + dy * dy
+        radius_squared = radius * radius
+        if squared > 1e-12:
+            # Odcinek parametru t, dla którego komórka leży pod narzędziem; frez płaski sięga
+            # najniżej na jednym z jego końców, bo Z zmienia się liniowo.
+            along = (cx * dx + cy * dy) / squared
+            across = np.maximum(cx * cx + cy * cy - along * along * squared, 0.0)
+            half = np.sqrt(np.maximum(radius_squared - across, 0.0) / squared)
+            low = np.clip(along - half, 0.0, 1.0)
+            high = np.clip(along + half, 0.0, 1.0)
+            covered = (across <= radius_squared) & (along - half <= 1.0) & (along + half >= 0.0)
+            depth = z0 + (z1 - z0) * (high if z1 < z0 else low)
+        else:
+            covered = cx * cx + cy * cy <= radius_squared
+            depth = np.full(covered.shape, min(z0, z1))
+
+        return self.z[j0:j1, i0:i1], covered, depth
+
+    def cut(self, start, end, radius):
+        if min(start[2], end[2]) >= self.top:
+            return False
+        swept = self._sweep(start, end, radius)
+        if swept is None:
+            return False
+        window, covered, depth = swept
+        lowered = covered & (depth < window)
+        if not lowered.any():
+            return False
+        window[lowered] = np.maximum(depth[lowered], self.bottom)
+        return True
+
+    def penetration(self, start, end, radius):
+        if min(start[2], end[2]) >= self.top:
+            return 0.0
+        swept = self._sweep(start, end, radius)
+        if swept is None:
+            return 0.0
+        window, covered, depth = swept
+        if not covered.any():
+            return 0.0
+        return max(float(np.max((window - depth)[covered])), 0.0)
+
+    def cut_path(self, points, radius):
+        changed = False
+        for start, end in zip(points[:-1], points[1:]):
+            changed |= self.cut(start, end, radius)
+        return changed
+
+    def removed_volume(self):
+        return float(np.sum(self.top - self.z) * self.cell[0] * self.cell[1])
+
+    def volume(self):
+        return float(np.sum(self.z - self.bottom) * self.cell[0] * self.cell[1])
+
+    def mesh(self):
+        ny, nx = self.z.shape
+        gx, gy = np.meshgrid(self.x, self.y)
+        vertices = np.column_stack((gx.ravel(), gy.ravel(), self.z.ravel()))
+        index = np.arange(nx * ny).reshape(ny, nx)
+        a = index[:-1, :-1].ravel()
+        b = index[:-1, 1:].ravel()
+        c = index[1:, 1:].ravel()
+        d = index[1:, :-1].ravel()
+        triangles = np.concatenate((np.column_stack((a, b, c)), np.column_stack((a, c, d))))
+        return vertices, triangles